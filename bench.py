@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Headless render benchmark for every screen and transition.
+
+Drives each screen, the boot animation and the slide transition against
+MockDisplay with the canned sample data from render_previews, and
+records per-frame render time, static rebuild time, allocations and the
+pixels each frame would push over SPI. It also times MarketData
+refreshes against the local fakeapi.py stand-in with a fixed, seeded
+latency, so network-side changes are measured without a network, and
+the anti-aliased chart rasteriser against Pillow's aliased drawing and
+4x supersampling.
+Results go to a JSON file that can be compared against a saved baseline:
+
+    python bench.py                                # writes bench.json
+    python bench.py --baseline baseline.json       # exit 1 on regressions
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw
+
+import fx
+import geometry
+import raster
+from fakeapi import StandInAPI
+from feargreeddisplay import SlideTransition, boot_frame
+from hardware import MockDisplay
+from market_data import MarketData, endpoints_for
+from render_previews import sample_data
+from screens import BG, ChartScreen, ConfigScreen, GaugeScreen, PriceScreen
+from theme import WIDTH, HEIGHT
+
+FPS = 30
+FRAMES = 150
+REBUILDS = 10
+RASTER_RUNS = 20
+ALLOC_FRAMES = 20
+# Frame loops run this many times; the best pass's median is compared,
+# since noise only ever adds time
+PASSES = 5
+THRESHOLD = 0.2
+# Slowdowns below about the timer's resolution are noise, whatever their ratio
+FLOOR_MS = 0.05
+# Stand-in API behaviour for the refresh timings
+API_LATENCY, API_JITTER = 0.02, 0.01
+# Timing metrics checked against the baseline (case -> metric -> stat)
+COMPARED = (("frame_ms", "best_p50"), ("rebuild_ms", "p50"))
+
+
+class BenchConfig:
+    display_time, brightness, led_brightness = 12, 1.0, 0.3
+    led_enabled, flip_display = True, False
+
+
+def _summary(secs):
+    ms = np.asarray(secs) * 1000
+    if not len(ms):
+        return {"p50": 0.0, "p95": 0.0, "mean": 0.0}
+    return {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+            "mean": float(ms.mean())}
+
+
+def _allocations(step, frames=ALLOC_FRAMES):
+    """Pillow images created and peak Python/NumPy heap per frame."""
+    step()  # warm caches so one-off setup is not counted
+    images = Image.core.get_stats()["new_count"]
+    tracemalloc.start()
+    peaks = []
+    try:
+        for _ in range(frames):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            step()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return {"images_per_frame": (Image.core.get_stats()["new_count"] - images) / frames,
+            "peak_kib": max(peaks) / 1024}
+
+
+def _run_frames(step, frames, passes=PASSES):
+    """Summary of per-frame times over `passes` runs of `frames` frames,
+    plus "best_p50", the lowest median of any one pass."""
+    times, medians = [], []
+    for _ in range(passes):
+        run = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            step()
+            run.append(time.perf_counter() - start)
+        times += run
+        medians.append(np.median(run) * 1000)
+    return dict(_summary(times), best_p50=float(min(medians)))
+
+
+def bench_screen(screen, frames=FRAMES):
+    display = MockDisplay()
+    screen.on_enter()
+    screen.update(0)
+
+    def step():
+        screen.update(1 / FPS)
+        display.show(screen.render(), screen.dirty)
+
+    frame_ms = _run_frames(step, frames)
+    pushed = display.pixels / display.frames
+    rebuilds = []
+    for _ in range(REBUILDS):
+        start = time.perf_counter()
+        screen._build_static()
+        rebuilds.append(time.perf_counter() - start)
+    return {"frame_ms": frame_ms, "rebuild_ms": _summary(rebuilds),
+            "alloc": _allocations(step), "pushed_px": pushed}
+
+
+def bench_boot(frames=FRAMES):
+    display = MockDisplay()
+    ts = iter(np.linspace(0, 1, (frames * PASSES + ALLOC_FRAMES) * 2 + 4) % 1)
+
+    def step():
+        display.show(boot_frame(next(ts)))
+
+    return {"frame_ms": _run_frames(step, frames),
+            "alloc": _allocations(step), "pushed_px": WIDTH * HEIGHT}
+
+
+def bench_slide(data, frames=FRAMES, freeze=True):
+    display = MockDisplay()
+    old = GaugeScreen(data)
+    new = PriceScreen(data)
+    for s in (old, new):
+        s.on_enter()
+        s.update(0)
+    old_frame = old.render()
+    slide = SlideTransition(freeze=freeze)
+
+    def step():
+        if not slide.active:
+            slide.start(old_frame, new.render() if freeze else None)
+        if slide.advance(1 / FPS):
+            return
+        incoming = None
+        if not freeze:
+            new.update(1 / FPS)
+            incoming = new.render()
+        display.show(slide.compose(incoming))
+
+    return {"frame_ms": _run_frames(step, frames),
+            "alloc": _allocations(step), "pushed_px": WIDTH * HEIGHT}
+
+
+def bench_refresh(refreshes):
+    """Cold-start and steady-state refresh wall time against the stand-in."""
+    api = StandInAPI(latency=API_LATENCY, jitter=API_JITTER, seed=1).start()
+    data = MarketData(endpoints=endpoints_for(api.url))
+    try:
+        start = time.perf_counter()
+        data.refresh()
+        cold = time.perf_counter() - start
+        times = []
+        for _ in range(refreshes):
+            start = time.perf_counter()
+            data.refresh()
+            times.append(time.perf_counter() - start)
+        return {"cold_ms": cold * 1000, "refresh_ms": _summary(times),
+                "requests": sum(api.hits.values())}
+    finally:
+        data.stop()
+        api.stop()
+
+
+def bench_raster(data, runs=RASTER_RUNS):
+    """One chart's line and fill: NumPy AA vs Pillow aliased vs 4x SSAA."""
+    box = ChartScreen.AREA
+    x0, _, x1, y1 = box
+    xs, prices = fx.downsample(data.chart_7d, x1 - x0)
+    pts = geometry.map_series(prices, box, xs=xs)
+    colour = (60, 220, 120)
+
+    def aa():
+        img = BG.copy()
+        raster.fill_under(img, pts, y1, colour, (0.34, 0.06))
+        raster.polyline(img, pts, colour, width=2)
+
+    def aliased():
+        d = ImageDraw.Draw(BG.copy())
+        flat = pts.ravel().tolist()
+        d.polygon(flat + [x1, y1, x0, y1], fill=(30, 60, 60))
+        d.line(flat, fill=colour, width=2, joint="curve")
+
+    def supersampled():
+        big = BG.resize((WIDTH * 4, HEIGHT * 4))
+        d = ImageDraw.Draw(big)
+        flat = (pts * 4).ravel().tolist()
+        d.polygon(flat + [x1 * 4, y1 * 4, x0 * 4, y1 * 4], fill=(30, 60, 60))
+        d.line(flat, fill=colour, width=8, joint="curve")
+        big.resize((WIDTH, HEIGHT), Image.BOX)
+
+    result = {}
+    for name, draw in (("aa_ms", aa), ("aliased_ms", aliased),
+                       ("supersample_ms", supersampled)):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            draw()
+            times.append(time.perf_counter() - start)
+        result[name] = _summary(times)
+    return result
+
+
+def run(frames=FRAMES):
+    data = sample_data()
+    cases = {
+        "gauge": bench_screen(GaugeScreen(data), frames),
+        "price": bench_screen(PriceScreen(data), frames),
+        "chart": bench_screen(ChartScreen(data), frames),
+        "config": bench_screen(ConfigScreen(data, BenchConfig()), frames),
+        "boot": bench_boot(frames),
+        "slide": bench_slide(data, frames),
+        "slide_live": bench_slide(data, frames, freeze=False),
+    }
+    refresh = bench_refresh(max(2, frames // 15))
+    meta = {"python": platform.python_version(), "pillow": PIL.__version__,
+            "numpy": np.__version__, "machine": platform.machine(), "frames": frames}
+    return {"meta": meta, "cases": cases, "refresh": refresh,
+            "raster": bench_raster(data, max(3, frames // 8))}
+
+
+def _slower(before, now, threshold, floor):
+    return before > 0 and now > before * (1 + threshold) and now - before >= floor
+
+
+def compare(result, baseline, threshold=THRESHOLD, floor=FLOOR_MS):
+    """List of (case, metric, stat, base, now) that got slower than allowed:
+    by more than `threshold` as a fraction and `floor` in milliseconds."""
+    regressions = []
+    for case, metrics in result["cases"].items():
+        base_case = baseline.get("cases", {}).get(case)
+        if not base_case:
+            continue
+        for metric, stat in COMPARED:
+            # Baselines from older runs may lack a stat
+            if stat not in metrics.get(metric, {}) or stat not in base_case.get(metric, {}):
+                continue
+            before, now = base_case[metric][stat], metrics[metric][stat]
+            if _slower(before, now, threshold, floor):
+                regressions.append((case, metric, stat, before, now))
+    if "refresh" in result and "refresh" in baseline:
+        before = baseline["refresh"]["refresh_ms"]["p50"]
+        now = result["refresh"]["refresh_ms"]["p50"]
+        if _slower(before, now, threshold, floor):
+            regressions.append(("refresh", "refresh_ms", "p50", before, now))
+    if "raster" in result and "raster" in baseline:
+        before = baseline["raster"]["aa_ms"]["p50"]
+        now = result["raster"]["aa_ms"]["p50"]
+        if _slower(before, now, threshold, floor):
+            regressions.append(("raster", "aa_ms", "p50", before, now))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-o", "--output", default="bench.json")
+    ap.add_argument("-n", "--frames", type=int, default=FRAMES)
+    ap.add_argument("--baseline", help="earlier result to compare against")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD,
+                    help="allowed slowdown as a fraction (default 0.2)")
+    ap.add_argument("--floor", type=float, default=FLOOR_MS,
+                    help="ignore slowdowns under this many ms (default 0.05)")
+    args = ap.parse_args(argv)
+
+    result = run(args.frames)
+    print(f"{'case':10} {'p50 ms':>8} {'p95 ms':>8} {'build ms':>9} {'img/fr':>7} "
+          f"{'peak KiB':>9} {'push %':>7}")
+    for name, c in result["cases"].items():
+        build = c.get("rebuild_ms", {}).get("p50", 0.0)
+        print(f"{name:10} {c['frame_ms']['p50']:8.2f} {c['frame_ms']['p95']:8.2f} "
+              f"{build:9.2f} {c['alloc']['images_per_frame']:7.1f} "
+              f"{c['alloc']['peak_kib']:9.1f} {100 * c['pushed_px'] / (WIDTH * HEIGHT):7.1f}")
+    r = result["refresh"]
+    print(f"refresh: cold {r['cold_ms']:.1f} ms, p50 {r['refresh_ms']['p50']:.1f} ms, "
+          f"p95 {r['refresh_ms']['p95']:.1f} ms over {r['requests']} requests")
+    r = result["raster"]
+    print(f"chart raster: AA {r['aa_ms']['p50']:.2f} ms, aliased "
+          f"{r['aliased_ms']['p50']:.2f} ms, 4x supersampled {r['supersample_ms']['p50']:.2f} ms")
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold, args.floor)
+        for case, metric, stat, before, now in regressions:
+            print(f"REGRESSION {case} {metric} {stat}: {before:.2f} -> {now:.2f} ms")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} and {args.floor} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Fear & Greed and CoinGecko APIs.
+
+Serves the recorded responses in fixtures/ on the same paths as the real
+APIs, with configurable latency, jitter, error rate and a rate limit
+that answers 429 with Retry-After, so MarketData refreshes can be timed
+and their backoff exercised offline and repeatably:
+
+    python fakeapi.py --port 8800 --latency 0.2 --jitter 0.1 --errors 0.05
+    python feargreeddisplay.py --api http://127.0.0.1:8800
+
+The recorded chart is replayed relative to the current time, so its
+newest point is always "now" and range requests return a live tail.
+Other coins in the markets fixture get the same chart scaled to their
+price, and the batched endpoints honour `ids`.
+Every 200 carries an ETag and Last-Modified, and a matching conditional
+request gets a bodiless 304, like the real CDNs.
+"""
+
+import argparse
+import collections
+import email.utils
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PORT = 8800
+ROUTES = {
+    "/fng/": "fng",
+    "/api/v3/coins/markets": "markets",
+    "/api/v3/simple/price": "simple_price",
+}
+CHART_ROUTE = re.compile(r"/api/v3/coins/([\w-]+)/market_chart(/range)?$")
+RATE_WINDOW = 60
+
+
+class StandInAPI:
+    """Threaded HTTP server replaying fixtures with injected faults.
+
+    `latency` +/- `jitter` seconds is added to every response, a
+    fraction `errors` of them fail with 500, and beyond `rate_limit`
+    requests a minute the rest get 429. `hits` and `statuses` count
+    what was served. A `seed` makes the faults repeatable.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, errors=0.0,
+                 rate_limit=0, fixtures=FIXTURES, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = errors
+        self.rate_limit = rate_limit
+        self.hits = collections.Counter()
+        self.statuses = collections.Counter()
+        self.payloads = {}
+        self.started = email.utils.formatdate(usegmt=True)   # Last-Modified of fixtures
+        for name in list(ROUTES.values()) + ["market_chart"]:
+            with open(os.path.join(fixtures, name + ".json")) as f:
+                self.payloads[name] = json.load(f)
+        self._rng = random.Random(seed)
+        self._recent = collections.deque()  # request times inside the rate window
+        self._lock = threading.Lock()
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = api.respond(self.path, self.headers)
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _route(self, path):
+        """(fixture name, coin id or None) for a request path."""
+        m = CHART_ROUTE.match(path)
+        if m is None:
+            return ROUTES.get(path), None
+        return ("range" if m.group(2) else "market_chart"), m.group(1)
+
+    def _chart(self, coin, query):
+        """The recorded chart shifted so its newest point is now, and
+        scaled to `coin`'s price; None for an unknown coin."""
+        prices = self.payloads["market_chart"]["prices"]
+        quotes = {d["id"]: d["current_price"] for d in self.payloads["markets"]}
+        if coin not in quotes:
+            return None
+        scale = quotes[coin] / quotes["bitcoin"]
+        shift = int(time.time() * 1000) - prices[-1][0]
+        points = [[t + shift, p if coin == "bitcoin" else round(p * scale, 4)]
+                  for t, p in prices]
+        if "from" in query:
+            lo = float(query["from"][0]) * 1000
+            hi = float(query.get("to", [time.time()])[0]) * 1000
+            points = [pt for pt in points if lo <= pt[0] <= hi]
+        return {"prices": points, "market_caps": [], "total_volumes": []}
+
+    def _fault(self):
+        """(status, headers) for an injected failure, or None; and a delay."""
+        now = time.monotonic()
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            if self.rate_limit:
+                while self._recent and now - self._recent[0] >= RATE_WINDOW:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    wait = math.ceil(RATE_WINDOW - (now - self._recent[0]))
+                    return (429, {"Retry-After": str(max(1, wait))}), delay
+                self._recent.append(now)
+            if self.errors and self._rng.random() < self.errors:
+                return (500, {}), delay
+        return None, delay
+
+    def respond(self, path, request_headers=None):
+        """(status, headers, body) for a GET of `path`."""
+        request_headers = request_headers or {}
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        name, coin = self._route(url.path)
+        payload = None
+        if name in ("market_chart", "range"):
+            payload = self._chart(coin, query if name == "range" else {})
+            modified = email.utils.formatdate(usegmt=True)
+        elif name is not None:
+            payload = self.payloads[name]
+            if "ids" in query:
+                ids = query["ids"][0].split(",")
+                if name == "markets":
+                    payload = [d for d in payload if d["id"] in ids]
+                else:
+                    payload = {k: v for k, v in payload.items() if k in ids}
+            modified = self.started
+        fault, delay = self._fault()
+        time.sleep(delay)
+        if payload is None:
+            status, headers, payload = 404, {}, {"error": "not found"}
+        elif fault:
+            status, headers = fault
+            payload = {"error": "rate limited" if status == 429 else "server error"}
+        else:
+            status, headers = 200, {}
+        body = json.dumps(payload).encode()
+        if status == 200:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            headers = {"ETag": etag, "Last-Modified": modified}
+            if (request_headers.get("If-None-Match") == etag
+                    or (request_headers.get("If-Modified-Since") == modified
+                        and "If-None-Match" not in request_headers)):
+                status, body = 304, b""
+        with self._lock:
+            self.hits[name or url.path] += 1
+            self.statuses[status] += 1
+        headers = dict(headers, **{"Content-Type": "application/json"})
+        return status, headers, body
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    ap.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of latency")
+    ap.add_argument("--errors", type=float, default=0.0, help="fraction answered with 500")
+    ap.add_argument("--rate-limit", type=int, default=0,
+                    help="requests per minute before 429s (0 = unlimited)")
+    ap.add_argument("--seed", type=int, help="make latency and faults repeatable")
+    args = ap.parse_args(argv)
+
+    api = StandInAPI(args.host, args.port, args.latency, args.jitter, args.errors,
+                     args.rate_limit, seed=args.seed)
+    print(f"Stand-in API on {api.url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+        print(f"Served {sum(api.hits.values())} requests: {dict(api.statuses)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ Procedural real-time rendering (no GIFs): animated gauge, price ticker
 and 7-day chart, with eased slide transitions and a mood LED.
 """
 
+import argparse
 import atexit
 import json
 import math
@@ -13,17 +14,37 @@ import signal
 import sys
 import time
 
+import numpy as np
 from PIL import Image, ImageDraw
 
+import fleet
 import fx
 import theme
-from hardware import Buttons, make_display
-from market_data import MarketData
-from screens import BG, ChartScreen, ConfigScreen, GaugeScreen, PriceScreen, _centred
+import regions
+from hardware import Buttons, DisplayWriter, make_display
+from history import History
+from market_data import MarketData, endpoints_for
+from profiler import FrameProfiler
+from screens import (BG, ChartScreen, ConfigScreen, GaugeScreen, PerfOverlay,
+                     PriceScreen, _centred)
 
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot.json")
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.db")
 TARGET_FPS = 30
+# Buttons and the LED are polled this often even while frames are sparse
+INPUT_HZ = 30
+# The perf overlay needs a live readout even on otherwise static screens
+OVERLAY_FPS = 10
+# Longest step fed to update() after a long idle gap
+MAX_DT = 0.5
 TRANSITION_SECS = 0.4
+# Hold the incoming screen's animation still while it slides in
+FREEZE_INCOMING = True
+# Pressing X and Y together toggles the hidden performance overlay
+CHORD = "X+Y"
+CHORD_BUTTONS = (Buttons.X, Buttons.Y)
+CHORD_SECS = 0.15
 
 
 class Config:
@@ -33,6 +54,7 @@ class Config:
         "led_brightness": 0.3,
         "led_enabled": True,
         "flip_display": False,
+        "coins": ["bitcoin"],       # CoinGecko ids, each with its own screens
     }
 
     def __init__(self):
@@ -61,82 +83,152 @@ class Config:
             print(f"Could not save config: {e}")
 
 
+def boot_frame(t):
+    """Boot animation frame at t (0-1): coin zoom-in with title fade."""
+    frame = BG.copy()
+    d = ImageDraw.Draw(frame)
+
+    coin_t = fx.ease_out_cubic(min(1.0, t / 0.55))
+    r = 8 + 42 * coin_t
+    wobble = 1 + 0.06 * math.sin(t * 14) * (1 - t)
+    rx, ry = r * wobble, r / wobble
+    cx, cy = 160, 96
+    glow = fx.lerp_colour(theme.BG_TOP, theme.GOLD, 0.25 * coin_t)
+    d.ellipse((cx - rx - 10, cy - ry - 10, cx + rx + 10, cy + ry + 10), fill=glow)
+    d.ellipse((cx - rx, cy - ry, cx + rx, cy + ry), fill=theme.GOLD)
+    d.ellipse((cx - rx * 0.78, cy - ry * 0.78, cx + rx * 0.78, cy + ry * 0.78),
+              outline=(200, 125, 15), width=2)
+    if coin_t > 0.5:
+        _centred(d, (cx, cy - 17), "B", theme.font("bold", 34), (60, 38, 5))
+
+    if t > 0.45:
+        ft = fx.ease_out_cubic((t - 0.45) / 0.4)
+        _centred(d, (160, 158), "FEAR & GREED",
+                 theme.font("bold", 22), fx.lerp_colour(theme.BG_BOTTOM, theme.WHITE, ft))
+        _centred(d, (160, 188), "BITCOIN MARKET SENTIMENT",
+                 theme.font("regular", 12), fx.lerp_colour(theme.BG_BOTTOM, theme.GREY, ft))
+    return frame
+
+
 def boot_animation(display):
-    """Short coin zoom-in with title fade. Roughly two seconds."""
+    """Play the boot animation. Roughly two seconds."""
     duration = 2.0
     start = time.monotonic()
     while True:
         t = (time.monotonic() - start) / duration
         if t >= 1:
             break
-        frame = BG.copy()
-        d = ImageDraw.Draw(frame)
-
-        coin_t = fx.ease_out_cubic(min(1.0, t / 0.55))
-        r = 8 + 42 * coin_t
-        wobble = 1 + 0.06 * math.sin(t * 14) * (1 - t)
-        rx, ry = r * wobble, r / wobble
-        cx, cy = 160, 96
-        glow = fx.lerp_colour(theme.BG_TOP, theme.GOLD, 0.25 * coin_t)
-        d.ellipse((cx - rx - 10, cy - ry - 10, cx + rx + 10, cy + ry + 10), fill=glow)
-        d.ellipse((cx - rx, cy - ry, cx + rx, cy + ry), fill=theme.GOLD)
-        d.ellipse((cx - rx * 0.78, cy - ry * 0.78, cx + rx * 0.78, cy + ry * 0.78),
-                  outline=(200, 125, 15), width=2)
-        if coin_t > 0.5:
-            _centred(d, (cx, cy - 17), "B", theme.font("bold", 34), (60, 38, 5))
-
-        if t > 0.45:
-            ft = fx.ease_out_cubic((t - 0.45) / 0.4)
-            _centred(d, (160, 158), "FEAR & GREED",
-                     theme.font("bold", 22), fx.lerp_colour(theme.BG_BOTTOM, theme.WHITE, ft))
-            _centred(d, (160, 188), "BITCOIN MARKET SENTIMENT",
-                     theme.font("regular", 12), fx.lerp_colour(theme.BG_BOTTOM, theme.GREY, ft))
-
-        display.show(frame)
+        display.show(boot_frame(t))
         time.sleep(1 / TARGET_FPS)
 
 
-def slide_transition(old_frame, new_frame, progress):
-    """Eased horizontal slide between two rendered frames."""
-    p = fx.ease_in_out(progress)
-    offset = int(theme.WIDTH * p)
-    frame = Image.new("RGB", (theme.WIDTH, theme.HEIGHT))
-    frame.paste(old_frame, (-offset, 0))
-    frame.paste(new_frame, (theme.WIDTH - offset, 0))
-    return frame
+class SlideTransition:
+    """Eased horizontal slide composited into a preallocated NumPy frame.
+
+    Each step copies the two visible column ranges into one array
+    allocated once; the display writer copies what it is shown, so the
+    next step can overwrite it straight away and sliding allocates no
+    images. With `freeze` the incoming frame is captured once at the
+    start rather than re-rendered every tick.
+    """
+
+    def __init__(self, freeze=FREEZE_INCOMING, secs=TRANSITION_SECS):
+        self.freeze = freeze
+        self.secs = secs
+        self.progress = None        # None when idle, else 0-1
+        self.old = None
+        self.new = None
+        self._buf = np.empty((theme.HEIGHT, theme.WIDTH, 3), np.uint8)
+
+    @property
+    def active(self):
+        return self.progress is not None
+
+    def start(self, old_frame, new_frame=None):
+        self.old = np.asarray(old_frame)
+        self.new = None if new_frame is None else np.asarray(new_frame)
+        self.progress = 0.0
+
+    def advance(self, dt):
+        """Step the slide; returns True once it has finished."""
+        self.progress += dt / self.secs
+        if self.progress >= 1.0:
+            self.progress = self.old = self.new = None
+            return True
+        return False
+
+    def compose(self, new_frame=None):
+        """The current slide frame, as an HxWx3 array."""
+        new = self.new if new_frame is None else np.asarray(new_frame)
+        offset = int(theme.WIDTH * fx.ease_in_out(self.progress))
+        out = self._buf
+        out[:, :theme.WIDTH - offset] = self.old[:, offset:]
+        out[:, theme.WIDTH - offset:] = new[:, :offset]
+        return out
 
 
 class ButtonReader:
-    """Edge detection so a held button fires once."""
+    """Edge detection so a held button fires once.
+
+    The two chord buttons fire on release, or once held for CHORD_SECS,
+    so pressing both together reports CHORD without either single action.
+    """
 
     def __init__(self, display):
         self.display = display
         self.state = {b: False for b in (Buttons.A, Buttons.B, Buttons.X, Buttons.Y)}
+        self.pending = {}           # chord button -> time it went down
+        self.chorded = False
 
-    def poll(self):
+    def poll(self, t=None):
+        t = time.monotonic() if t is None else t
         fired = []
         for b in self.state:
             now = self.display.pressed(b)
             if now and not self.state[b]:
-                fired.append(b)
+                if b not in CHORD_BUTTONS:
+                    fired.append(b)
+                elif not self.chorded:
+                    self.pending[b] = t
             self.state[b] = now
+        if all(self.state[b] for b in CHORD_BUTTONS) and not self.chorded:
+            self.chorded = True
+            self.pending.clear()
+            fired.append(CHORD)
+        for b, down in list(self.pending.items()):
+            if not self.state[b] or t - down >= CHORD_SECS:
+                del self.pending[b]
+                fired.append(b)
+        if not any(self.state[b] for b in CHORD_BUTTONS):
+            self.chorded = False
         return fired
 
 
 class App:
-    def __init__(self):
-        self.display = make_display()
+    def __init__(self, display=None, api=None):
+        self.display = DisplayWriter(display or make_display())
         self.config = Config()
-        self.data = MarketData()
-        self.screens = [GaugeScreen(self.data), PriceScreen(self.data),
-                        ChartScreen(self.data)]
+        self.data = MarketData(cache_path=SNAPSHOT_PATH,
+                               endpoints=endpoints_for(api) if api else None,
+                               coins=tuple(self.config.coins),
+                               history=History(HISTORY_PATH))
+        self.screens = [GaugeScreen(self.data)]
+        for coin in self.data.assets:
+            self.screens += [PriceScreen(self.data, coin), ChartScreen(self.data, coin)]
         self.config_screen = ConfigScreen(self.data, self.config)
         self.index = 0
         self.in_config = False
-        self.transition = None      # (old_frame, progress) while sliding
+        self.slide = SlideTransition()
         self.mode_timer = 0.0
         self.buttons = ButtonReader(self.display)
         self.led_value = None
+        self.shown = None           # screen whose frame is on the panel
+        self.profiler = FrameProfiler(1 / TARGET_FPS)
+        self.overlay = None         # PerfOverlay while toggled on
+        self.redraw = True          # render on the next tick regardless of rate
+        self.display.profiler = self.profiler
+        for s in self.screens + [self.config_screen]:
+            s.profiler = self.profiler
 
     @property
     def screen(self):
@@ -146,7 +238,11 @@ class App:
         old_frame = self.screen.render()
         self.index = new_index % len(self.screens)
         self.screen.on_enter()
-        self.transition = [old_frame, 0.0]
+        new_frame = None
+        if self.slide.freeze:
+            self.screen.update(0)
+            new_frame = self.screen.render()
+        self.slide.start(old_frame, new_frame)
         self.mode_timer = 0.0
 
     def update_led(self, t):
@@ -159,9 +255,20 @@ class App:
         b = self.config.led_brightness * breathe
         self.display.set_led(colour[0] / 255 * b, colour[1] / 255 * b, colour[2] / 255 * b)
 
+    def frame_rate(self):
+        """Frames per second the loop should render at right now."""
+        if self.slide.active:
+            return TARGET_FPS
+        fps = min(TARGET_FPS, self.screen.fps())
+        return max(fps, OVERLAY_FPS) if self.overlay else fps
+
     def handle_buttons(self):
         for b in self.buttons.poll():
-            if self.in_config:
+            self.redraw = True
+            if b == CHORD:
+                self.overlay = None if self.overlay else PerfOverlay()
+                self.shown = None
+            elif self.in_config:
                 self.handle_config_button(b)
             elif b == Buttons.A:
                 self.in_config = True
@@ -209,45 +316,109 @@ class App:
         self.data.start()
         boot_animation(self.display)
 
-        last = time.monotonic()
+        last = next_frame = time.monotonic()
+        prof = self.profiler
         while True:
             now = time.monotonic()
-            dt = min(0.1, now - last)
-            last = now
-
             self.handle_buttons()
             self.update_led(now)
+            if now < next_frame and not self.redraw:
+                time.sleep(min(next_frame - now, 1 / INPUT_HZ))
+                continue
 
-            if self.transition:
-                self.transition[1] += dt / TRANSITION_SECS
-                self.screen.update(dt)
-                if self.transition[1] >= 1.0:
+            prof.begin()
+            dt = min(MAX_DT, now - last)
+            last = now
+            self.redraw = False
+
+            if self.slide.active:
+                frozen = self.slide.freeze
+                if self.slide.advance(dt):
+                    self.screen.update(dt)
+                    prof.mark("update")
                     frame = self.screen.render()
-                    self.transition = None
+                    prof.mark("render")
                 else:
-                    frame = slide_transition(self.transition[0],
-                                             self.screen.render(),
-                                             self.transition[1])
+                    incoming = None
+                    if not frozen:
+                        self.screen.update(dt)
+                        prof.mark("update")
+                        incoming = self.screen.render()
+                        prof.mark("render")
+                    frame = self.slide.compose(incoming)
+                    prof.mark("transition")
+                dirty, self.shown = None, None
             else:
                 self.screen.update(dt)
+                prof.mark("update")
                 frame = self.screen.render()
+                prof.mark("render")
+                # Partial pushes are only valid on top of this screen's own
+                # previous frame, not after a slide or a settings toggle
+                dirty = self.screen.dirty if self.shown is self.screen else None
+                self.shown = self.screen
                 if not self.in_config:
                     self.mode_timer += dt
                     if self.mode_timer >= self.config.display_time:
                         self.switch_to(self.index + 1)
 
-            self.display.show(frame)
-
-            elapsed = time.monotonic() - now
-            if elapsed < 1 / TARGET_FPS:
-                time.sleep(1 / TARGET_FPS - elapsed)
-
+            if self.overlay:
+                # Screens render into buffers they reuse, so draw on a copy
+                if isinstance(frame, np.ndarray):
+                    frame = Image.fromarray(frame)
+                else:
+                    frame = frame.copy()
+                box = self.overlay.draw(frame, prof, self.display, self.screen)
+                dirty = None if dirty is None else regions.merge([dirty, [box]])
+                prof.mark("render")
+
+            self.display.show(frame, dirty)
+            prof.mark("show")
+            # Schedule from the frame start so the rate holds under load,
+            # but never try to catch up on frames that were missed
+            next_frame = max(now + 1 / self.frame_rate(), time.monotonic())
+
+
+def run_client(address):
+    """Thin-client mode: mirror a fleet server instead of rendering."""
+    host, _, port = address.partition(":")
+    config = Config()
+    display = make_display()
+    display.set_backlight(config.brightness)
+    display.set_flip(config.flip_display)
+    client = fleet.FleetClient(display, host, int(port or fleet.PORT))
+    try:
+        client.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.stop()
+        display.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--serve", type=int, nargs="?", const=fleet.PORT, metavar="PORT",
+                    help="also publish frames to fleet clients on PORT")
+    ap.add_argument("--bind", default=fleet.HOST, metavar="HOST",
+                    help="address to serve on (default localhost; 0.0.0.0 for the LAN)")
+    ap.add_argument("--connect", metavar="HOST[:PORT]",
+                    help="run as a thin client of a fleet server")
+    ap.add_argument("--api", metavar="URL",
+                    help="fetch from this base URL instead, e.g. a fakeapi.py stand-in")
+    args = ap.parse_args(argv)
 
-def main():
     # systemd stops the service with SIGTERM; turn it into a clean exit so
     # the finally block runs and the LED/backlight are switched off.
     signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
-    app = App()
+    if args.connect:
+        run_client(args.connect)
+        return
+    display = None
+    if args.serve:
+        display = fleet.FleetServer(local=make_display(), host=args.bind, port=args.serve)
+        print(f"Serving frames on {args.bind}:{args.serve}")
+    app = App(display, api=args.api)
     try:
         app.run()
     except KeyboardInterrupt:
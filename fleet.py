@@ -0,0 +1,281 @@
+"""Fleet mode: one renderer feeding many displays over TCP.
+
+`FleetServer` stands in for a display. The main loop renders as usual
+and the server publishes each frame's dirty rectangles, zlib-compressed,
+to every connected client. `FleetClient` runs on the thin boards: it
+patches the rectangles into a local frame and blits that to its own
+display, so only the server talks to the APIs.
+
+Wire format, big-endian: a header (magic, kind, sequence, count), then
+for frames `count` rectangles of (x0, y0, x1, y1, length) followed by
+`length` bytes of compressed RGB888, or for the LED three floats.
+
+There is no authentication: anyone who can reach the port can watch the
+frames. The server listens on localhost unless given another host, so
+serving a LAN is an explicit choice.
+"""
+
+import socket
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import regions
+from theme import WIDTH, HEIGHT
+
+PORT = 8765
+HOST = "127.0.0.1"
+# Largest compressed rectangle a client accepts: a whole frame, plus
+# zlib's overhead on incompressible data
+MAX_BYTES = HEIGHT * WIDTH * 3 + 1024
+MAGIC = b"FGD1"
+HEADER = struct.Struct("!4sBIH")
+RECT = struct.Struct("!HHHHI")
+LED = struct.Struct("!fff")
+FRAME, LED_COLOUR = 0, 1
+# Fast compression: the Pi's time is better spent rendering
+LEVEL = 1
+RETRY_SECS = 2.0
+
+
+def encode_frame(frame, boxes, seq):
+    """Frame message carrying `boxes` (None for all) of an HxWx3 array."""
+    boxes = [(0, 0, WIDTH, HEIGHT)] if boxes is None else boxes
+    parts = [HEADER.pack(MAGIC, FRAME, seq, len(boxes))]
+    for x0, y0, x1, y1 in boxes:
+        data = zlib.compress(np.ascontiguousarray(frame[y0:y1, x0:x1]), LEVEL)
+        parts.append(RECT.pack(x0, y0, x1, y1, len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def _clip(boxes):
+    out = []
+    for x0, y0, x1, y1 in boxes:
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(WIDTH, int(x1)), min(HEIGHT, int(y1))
+        if x1 > x0 and y1 > y0:
+            out.append((x0, y0, x1, y1))
+    return out
+
+
+class _Peer:
+    """One connected client, fed by its own thread.
+
+    Like DisplayWriter, a client that falls behind keeps only the latest
+    frame: pending boxes are merged and re-encoded from the server's
+    current frame when the socket is ready.
+    """
+
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.alive = True
+        self._pending = (None, None)    # (message, boxes); a keyframe first
+        self._led = None
+        self._cond = threading.Condition()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def offer(self, msg, boxes):
+        with self._cond:
+            if self._pending is not None:
+                older = self._pending[1]
+                msg = None
+                boxes = None if older is None or boxes is None else regions.merge(
+                    [older, boxes])
+            self._pending = (msg, boxes)
+            self._cond.notify()
+
+    def offer_led(self, msg):
+        with self._cond:
+            self._led = msg
+            self._cond.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while self._pending is None and self._led is None and self.alive:
+                        self._cond.wait()
+                    if not self.alive:
+                        return
+                    pending, led = self._pending, self._led
+                    self._pending = self._led = None
+                if pending is not None:
+                    msg, boxes = pending
+                    self.sock.sendall(msg or self.server.encode(boxes))
+                if led is not None:
+                    self.sock.sendall(led)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self._cond:
+            self.alive = False
+            self._cond.notify()
+        self.sock.close()
+
+
+class FleetServer:
+    """Display that broadcasts frames to thin clients, and optionally
+    also drives a local panel (buttons and flip come from that one)."""
+
+    def __init__(self, local=None, host=HOST, port=PORT):
+        self.local = local
+        self.frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+        self.seq = 0
+        self.peers = []
+        self._led = None
+        self._lock = threading.Lock()
+        self._sock = socket.create_server((host, port))
+        self.address = self._sock.getsockname()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            peer = _Peer(self, sock)
+            if self._led is not None:
+                peer.offer_led(self._led_message(*self._led))
+            # Registered before its thread sends the keyframe, so boxes
+            # shown meanwhile merge into it rather than missing this peer
+            with self._lock:
+                self.peers = [p for p in self.peers if p.alive] + [peer]
+            peer.start()
+
+    def encode(self, boxes):
+        with self._lock:
+            return encode_frame(self.frame, boxes, self.seq)
+
+    def show(self, image, dirty=None):
+        if self.local:
+            self.local.show(image, dirty)
+        arr = np.asarray(image)
+        boxes = None if dirty is None else _clip(dirty)
+        with self._lock:
+            if boxes is None:
+                self.frame[:] = arr
+            else:
+                for x0, y0, x1, y1 in boxes:
+                    self.frame[y0:y1, x0:x1] = arr[y0:y1, x0:x1]
+            self.seq += 1
+            peers = [p for p in self.peers if p.alive]
+            # Encode once for every client that is keeping up
+            msg = encode_frame(self.frame, boxes, self.seq) if peers else None
+        for p in peers:
+            p.offer(msg, boxes)
+
+    def _led_message(self, r, g, b):
+        return HEADER.pack(MAGIC, LED_COLOUR, self.seq, 0) + LED.pack(r, g, b)
+
+    def set_led(self, r, g, b):
+        if self.local:
+            self.local.set_led(r, g, b)
+        if (r, g, b) == self._led:
+            return
+        self._led = (r, g, b)
+        msg = self._led_message(r, g, b)
+        for p in self.peers:
+            if p.alive:
+                p.offer_led(msg)
+
+    def set_flip(self, flipped):
+        # Each client flips for its own mounting
+        if self.local:
+            self.local.set_flip(flipped)
+
+    def set_backlight(self, level):
+        if self.local:
+            self.local.set_backlight(level)
+
+    def pressed(self, name):
+        return self.local.pressed(name) if self.local else False
+
+    def close(self):
+        self._sock.close()
+        for p in self.peers:
+            p.close()
+        if self.local:
+            self.local.close()
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    while n:
+        got = sock.recv_into(view[len(buf) - n:], n)
+        if not got:
+            raise ConnectionError("server closed the connection")
+        n -= got
+    return bytes(buf)
+
+
+class FleetClient:
+    """Thin client: mirror a FleetServer onto a local display."""
+
+    def __init__(self, display, host, port=PORT):
+        self.display = display
+        self.host = host
+        self.port = port
+        self.frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+        self.frames = 0
+        self._running = True
+        self._sock = None
+
+    def receive(self, sock):
+        """Apply messages from a connected socket until it closes."""
+        while self._running:
+            magic, kind, _, count = HEADER.unpack(_recv_exact(sock, HEADER.size))
+            if magic != MAGIC:
+                raise ConnectionError("not a fleet server")
+            if kind == LED_COLOUR:
+                self.display.set_led(*LED.unpack(_recv_exact(sock, LED.size)))
+                continue
+            boxes = []
+            for _ in range(count):
+                x0, y0, x1, y1, size = RECT.unpack(_recv_exact(sock, RECT.size))
+                if not (0 <= x0 < x1 <= WIDTH and 0 <= y0 < y1 <= HEIGHT) or size > MAX_BYTES:
+                    raise ValueError("malformed rectangle")
+                # Never inflate more than the rectangle holds, whatever is sent
+                z = zlib.decompressobj()
+                data = z.decompress(_recv_exact(sock, size), (y1 - y0) * (x1 - x0) * 3)
+                if z.unconsumed_tail:
+                    raise ValueError("rectangle data too long")
+                self.frame[y0:y1, x0:x1] = np.frombuffer(data, np.uint8).reshape(
+                    y1 - y0, x1 - x0, 3)
+                boxes.append((x0, y0, x1, y1))
+            full = boxes == [(0, 0, WIDTH, HEIGHT)]
+            self.display.show(self.frame, None if full else boxes)
+            self.frames += 1
+
+    def run(self):
+        """Connect, mirror, and reconnect whenever the server goes away."""
+        while self._running:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                    sock.settimeout(None)
+                    self._sock = sock
+                    self.receive(sock)
+            except (OSError, ValueError, zlib.error) as e:
+                if self._running:
+                    print(f"Fleet connection to {self.host}:{self.port} lost: {e}")
+                    time.sleep(RETRY_SECS)
+
+    def stop(self):
+        self._running = False
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
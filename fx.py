@@ -1,7 +1,8 @@
 """Small animation/render helpers: easing, gradients, glow text, particles."""
 
+import collections
+import functools
 import math
-import random
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFilter
@@ -38,10 +39,95 @@ def vertical_gradient(top, bottom, size=(WIDTH, HEIGHT)):
     return Image.fromarray(arr, "RGB")
 
 
+def colour_lut(stops, size=256):
+    """`size` RGB colours interpolated across (value, colour) stops."""
+    vals = np.array([v for v, _ in stops], dtype=np.float64)
+    cols = np.array([c for _, c in stops], dtype=np.float64)
+    x = np.linspace(vals[0], vals[-1], size)
+    return np.stack([np.interp(x, vals, cols[:, i]) for i in range(3)], axis=1).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=4)
+def gradient_arc(r_out, width, stops):
+    """Anti-aliased top half-ring, coloured left to right through `stops`.
+
+    Computed once per size with vectorised polar maths instead of one
+    draw.arc per step. Returns an RGBA image whose centre pixel is at
+    (r_out + 1, r_out + 1); paste it with itself as the mask.
+    """
+    c = r_out + 1
+    y, x = np.mgrid[0:c + 1, 0:2 * c + 1].astype(np.float32)
+    dx, dy = x - c, y - c
+    dist = np.hypot(dx, dy)
+    # Coverage of the outer and inner edges (pixel-centre distance), and
+    # a hard cut below the centre row where the arc ends
+    alpha = (np.clip(r_out + 1 - dist, 0, 1) * np.clip(dist - r_out + width, 0, 1)
+             * (dy <= 0))
+    value = 1 - np.arctan2(np.abs(dy), dx) / np.pi
+    lut = colour_lut(stops)
+    rgba = np.empty(dist.shape + (4,), np.uint8)
+    rgba[..., :3] = lut[np.rint(value * (len(lut) - 1)).astype(np.intp)]
+    rgba[..., 3] = np.rint(alpha * 255).astype(np.uint8)
+    return Image.fromarray(rgba, "RGBA")
+
+
+# Pre-rasterised text: `image` is pasted with its top-left at the text
+# origin plus (dx, dy), the same place draw.text would put the ink.
+Sprite = collections.namedtuple("Sprite", "image dx dy")
+
+_MEASURE = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+@functools.lru_cache(maxsize=1024)
+def text_bbox(text, fnt):
+    """textbbox of `text` drawn at the origin, cached."""
+    return _MEASURE.textbbox((0, 0), text, font=fnt)
+
+
+@functools.lru_cache(maxsize=256)
+def text_mask(text, fnt):
+    """Rasterised text as an 'L' coverage Sprite; paste any fill through it."""
+    x0, y0, x1, y1 = text_bbox(text, fnt)
+    img = Image.new("L", (max(1, x1 - x0), max(1, y1 - y0)))
+    ImageDraw.Draw(img).text((-x0, -y0), text, font=fnt, fill=255)
+    return Sprite(img, x0, y0)
+
+
+@functools.lru_cache(maxsize=512)
+def _glyph(ch, fnt):
+    return text_mask(ch, fnt), fnt.getlength(ch)
+
+
+def draw_text(img, xy, text, fnt, fill, align="left", atlas=False):
+    """Paste cached text sprites onto `img`; returns the box covered.
+
+    `align` anchors the ink at xy[0] ("left", "centre" or "right"). With
+    `atlas` the string is composed from per-glyph sprites, so a number
+    that changes every frame (a count-up) never has to be rasterised.
+    """
+    if atlas:
+        parts, pen = [], 0.0
+        for ch in text:
+            sprite, advance = _glyph(ch, fnt)
+            parts.append((sprite, pen))
+            pen += advance
+    else:
+        parts = [(text_mask(text, fnt), 0.0)]
+    left = min(pen + s.dx for s, pen in parts)
+    right = max(pen + s.dx + s.image.width for s, pen in parts)
+    ox = xy[0] - {"left": left, "centre": (left + right) / 2, "right": right}[align]
+    for s, pen in parts:
+        img.paste(fill, (round(ox + pen + s.dx), round(xy[1] + s.dy)), s.image)
+    top = min(s.dy for s, _ in parts)
+    bottom = max(s.dy + s.image.height for s, _ in parts)
+    return (math.floor(ox + left), math.floor(xy[1] + top),
+            math.ceil(ox + right) + 1, math.ceil(xy[1] + bottom) + 1)
+
+
+@functools.lru_cache(maxsize=64)
 def glow_text(text, fnt, colour, blur=8, expand=24):
-    """Render text with a soft glow. Returns an RGBA image to paste."""
-    dummy = ImageDraw.Draw(Image.new("RGB", (1, 1)))
-    box = dummy.textbbox((0, 0), text, font=fnt)
+    """Render text with a soft glow. Returns a cached RGBA image to paste."""
+    box = text_bbox(text, fnt)
     w = box[2] - box[0] + expand * 2
     h = box[3] - box[1] + expand * 2
     img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
@@ -51,71 +137,104 @@ def glow_text(text, fnt, colour, blur=8, expand=24):
     return Image.alpha_composite(halo, img)
 
 
+@functools.lru_cache(maxsize=8)
+def dot_mask(r):
+    """Pre-rendered filled circle of radius r as an 'L' stamp."""
+    img = Image.new("L", (2 * r + 1, 2 * r + 1))
+    ImageDraw.Draw(img).ellipse((0, 0, 2 * r, 2 * r), fill=255)
+    return img
+
+
 class Particles:
     """Slow upward-drifting embers, drawn straight on the frame.
 
-    Colours are pre-faded toward the background so no alpha compositing
-    is needed per frame (cheap on the Pi Zero).
+    Held as NumPy arrays (one per attribute) so update and respawn are
+    batched, and drawn by stamping a pre-rendered dot per ember, which
+    keeps a few hundred of them cheap. Colours are pre-faded toward the
+    background so no alpha compositing is needed per frame.
     """
 
-    def __init__(self, count, colour, bg, area=(WIDTH, HEIGHT)):
+    def __init__(self, count, colour, bg, area=(WIDTH, HEIGHT), seed=None):
         self.w, self.h = area
-        self.dots = []
-        for _ in range(count):
-            self.dots.append(self._spawn(random.uniform(0, self.h)))
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.vy = np.zeros(count)
+        self.drift = np.zeros(count)
+        self.r = np.zeros(count, dtype=np.intp)
+        self.tone = np.zeros(count)
+        self._spawn(np.ones(count, dtype=bool), spread=True)
         self.set_colour(colour, bg)
 
-    def _spawn(self, y=None):
-        return {
-            "x": random.uniform(0, self.w),
-            "y": self.h + 4 if y is None else y,
-            "vy": random.uniform(8, 26),
-            "drift": random.uniform(-6, 6),
-            "r": random.choice((1, 1, 2)),
-            "tone": random.uniform(0.15, 0.55),
-        }
+    def __len__(self):
+        return len(self.x)
+
+    def _spawn(self, mask, spread=False):
+        n = int(mask.sum())
+        rng = self.rng
+        self.x[mask] = rng.uniform(0, self.w, n)
+        self.y[mask] = rng.uniform(0, self.h, n) if spread else self.h + 4
+        self.vy[mask] = rng.uniform(8, 26, n)
+        self.drift[mask] = rng.uniform(-6, 6, n)
+        self.r[mask] = rng.choice((1, 1, 2), n)
+        self.tone[mask] = rng.uniform(0.15, 0.55, n)
 
     def set_colour(self, colour, bg):
         self.shades = [lerp_colour(bg, colour, t / 10) for t in range(2, 8)]
 
     def update(self, dt):
-        for d in self.dots:
-            d["y"] -= d["vy"] * dt
-            d["x"] += d["drift"] * dt
-            if d["y"] < -4:
-                d.update(self._spawn())
+        self.y -= self.vy * dt
+        self.x += self.drift * dt
+        gone = self.y < -4
+        if gone.any():
+            self._spawn(gone)
 
-    def draw(self, draw):
+    def draw(self, img):
         n = len(self.shades)
-        for d in self.dots:
-            shade = self.shades[min(n - 1, int(d["tone"] * n))]
-            r = d["r"]
-            x, y = d["x"], d["y"]
-            draw.ellipse((x - r, y - r, x + r, y + r), fill=shade)
-
-
-def downsample(points, target):
-    """Reduce a list of floats to roughly `target` evenly spaced samples."""
-    if len(points) <= target:
-        return list(points)
-    step = (len(points) - 1) / (target - 1)
-    return [points[round(i * step)] for i in range(target)]
-
-
-def polyline_at(pts, t):
-    """Point at parameter t (0-1) along a polyline of (x, y) tuples."""
-    if not pts:
-        return 0, 0
-    if len(pts) == 1 or t <= 0:
-        return pts[0]
-    if t >= 1:
-        return pts[-1]
-    pos = t * (len(pts) - 1)
-    i = int(pos)
-    f = pos - i
-    x = lerp(pts[i][0], pts[i + 1][0], f)
-    y = lerp(pts[i][1], pts[i + 1][1], f)
-    return x, y
+        shade = np.minimum(n - 1, (self.tone * n).astype(np.intp))
+        xs = np.rint(self.x - self.r).astype(np.intp)
+        ys = np.rint(self.y - self.r).astype(np.intp)
+        shades = self.shades
+        for x, y, r, s in zip(xs.tolist(), ys.tolist(), self.r.tolist(), shade.tolist()):
+            img.paste(shades[s], (x, y), dot_mask(r))
+
+    def boxes(self):
+        """Nx4 array of the boxes the dots cover, for dirty tracking."""
+        return np.stack([self.x - self.r - 1, self.y - self.r - 1,
+                         self.x + self.r + 2, self.y + self.r + 2], axis=1)
+
+
+def _first_per_column(idx, col):
+    """The first of `idx` (ascending) in each pixel column."""
+    c = col[idx]
+    return idx[np.r_[True, c[1:] != c[:-1]]]
+
+
+def downsample(points, width):
+    """M4 downsampling of a series onto `width` pixel columns.
+
+    Keeps the first, lowest, highest and last point of every column, so
+    the drawn line matches the full series pixel for pixel and a spike
+    between samples is never lost. Accepts a list, `array('d')` or
+    ndarray and returns (x, y) float ndarrays, x being each kept point's
+    position along the series (0-1) for geometry.map_series. A series
+    no longer than `width` comes back whole. Vectorised: tens of
+    thousands of points cost a few NumPy passes, not a Python loop.
+    """
+    y = np.asarray(points, dtype=np.float64)
+    n = len(y)
+    if n <= width:
+        return np.linspace(0.0, 1.0, n), y.copy()
+    col = np.arange(n) * width // n             # every column gets a point
+    starts = np.flatnonzero(np.r_[True, col[1:] != col[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    lo = np.minimum.reduceat(y, starts)[col]
+    hi = np.maximum.reduceat(y, starts)[col]
+    keep = np.unique(np.concatenate((
+        starts, ends,
+        _first_per_column(np.flatnonzero(y == lo), col),
+        _first_per_column(np.flatnonzero(y == hi), col))))
+    return keep / (n - 1), y[keep]
 
 
 def pulse(t, period):
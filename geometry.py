@@ -0,0 +1,69 @@
+"""Series-to-pixel geometry for the sparkline and chart.
+
+Mapping is one NumPy pass over the whole series. `Polyline` measures
+its cumulative arc length once, when the static layer is built, so the
+per-frame lookup of the travelling dot is a binary search rather than a
+walk, and the dot covers equal screen distance in equal time however
+unevenly the points are spaced.
+"""
+
+import bisect
+
+import numpy as np
+
+
+def map_series(values, box, lo=None, hi=None, xs=None):
+    """Map a series onto box (x0, y0, x1, y1) as an Nx2 array of points.
+
+    x spans the box evenly, or by `xs` positions (0-1) from downsample;
+    y runs bottom (lo) to top (hi), which default to the series' range.
+    """
+    x0, y0, x1, y1 = box
+    values = np.asarray(values, dtype=np.float64)
+    lo = values.min() if lo is None else lo
+    hi = values.max() if hi is None else hi
+    span = (hi - lo) or 1
+    pts = np.empty((len(values), 2))
+    pts[:, 0] = (np.linspace(x0, x1, len(values)) if xs is None
+                 else x0 + (x1 - x0) * np.asarray(xs, dtype=np.float64))
+    pts[:, 1] = y1 - (y1 - y0) * (values - lo) / span
+    return pts
+
+
+def extremes(values):
+    """(index of the lowest, index of the highest) value in a series."""
+    values = np.asarray(values)
+    return int(values.argmin()), int(values.argmax())
+
+
+class Polyline:
+    """Points (an Nx2 array or (x, y) pairs) with their arc length."""
+
+    def __init__(self, pts):
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+        self.pts = pts
+        seg = np.hypot(*np.diff(pts, axis=0).T)
+        cum = np.concatenate(([0.0], np.cumsum(seg)))
+        self.length = float(cum[-1]) if len(pts) else 0.0
+        # at() runs every frame: plain lists beat NumPy scalars there
+        self._cum = cum.tolist()
+        self._xy = pts.tolist()
+
+    def __len__(self):
+        return len(self._xy)
+
+    def at(self, t):
+        """Point a fraction t (0-1) of the way along, by arc length."""
+        xy = self._xy
+        if not xy:
+            return 0, 0
+        if t <= 0 or self.length == 0:
+            return tuple(xy[0])
+        if t >= 1:
+            return tuple(xy[-1])
+        d = t * self.length
+        i = min(bisect.bisect_right(self._cum, d), len(xy) - 1)
+        c0, c1 = self._cum[i - 1], self._cum[i]
+        f = (d - c0) / (c1 - c0) if c1 > c0 else 0.0
+        (xa, ya), (xb, yb) = xy[i - 1], xy[i]
+        return xa + (xb - xa) * f, ya + (yb - ya) * f
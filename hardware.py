@@ -1,7 +1,21 @@
-"""Display HAT Mini wrapper, with a mock fallback for desktop development."""
+"""Display HAT Mini wrapper, with a mock fallback for desktop development.
 
+`show(image, dirty)` takes a PIL image or an HxWx3 uint8 array plus the
+list of changed boxes a screen reports (or None for the whole frame), so
+only those windows go over SPI.
+`DisplayWriter` moves that push onto its own thread so rendering the
+next frame overlaps with transferring the current one, and skips frames
+identical to the one already on the panel.
+"""
+
+import threading
+import time
+import zlib
+
+import numpy as np
 from PIL import Image
 
+import regions
 from theme import WIDTH, HEIGHT
 
 try:
@@ -21,12 +35,65 @@ class Buttons:
 _FLIP_MAP = {Buttons.A: Buttons.Y, Buttons.B: Buttons.X,
              Buttons.X: Buttons.B, Buttons.Y: Buttons.A}
 
+_SPI_CHUNK = 4096
+
+
+def _rotate_box(box, rotation):
+    """Map an image-space box onto the panel for a 0/180 degree rotation."""
+    if rotation == 0:
+        return box
+    x0, y0, x1, y1 = box
+    return WIDTH - x1, HEIGHT - y1, WIDTH - x0, HEIGHT - y0
+
+
+class RGB565Packer:
+    """Packs RGB frames straight into the panel's big-endian RGB565 bytes.
+
+    A 180 degree rotation is folded in as a reversed-stride view, and the
+    output and scratch arrays are cached per window size, so a push makes
+    no intermediate images or uint16 temporaries.
+    """
+
+    def __init__(self):
+        self._bufs = {}
+
+    def _buffers(self, h, w):
+        key = (h, w)
+        if key not in self._bufs:
+            self._bufs[key] = (np.empty((h, w, 2), np.uint8), np.empty((h, w), np.uint8))
+        return self._bufs[key]
+
+    def pack(self, frame, box=None, rotation=0):
+        """RGB565 bytes for `box` of a PIL image or HxWx3 uint8 array."""
+        x0, y0, x1, y1 = box or (0, 0, WIDTH, HEIGHT)
+        if isinstance(frame, np.ndarray):
+            src = frame[y0:y1, x0:x1]
+        elif box is None:
+            src = np.asarray(frame)
+        else:
+            src = np.asarray(frame.crop(box))
+        if rotation == 180:
+            src = src[::-1, ::-1]
+        out, tmp = self._buffers(y1 - y0, x1 - x0)
+        r, g, b = src[..., 0], src[..., 1], src[..., 2]
+        hi, lo = out[..., 0], out[..., 1]
+        # hi = RRRRRGGG, lo = GGGBBBBB
+        np.bitwise_and(r, 0xF8, out=hi)
+        np.right_shift(g, 5, out=tmp)
+        np.bitwise_or(hi, tmp, out=hi)
+        np.bitwise_and(g, 0x1C, out=lo)
+        np.left_shift(lo, 3, out=lo)
+        np.right_shift(b, 3, out=tmp)
+        np.bitwise_or(lo, tmp, out=lo)
+        return out.tobytes()
+
 
 class PiDisplay:
     def __init__(self):
         self.buffer = Image.new("RGB", (WIDTH, HEIGHT))
         self.dhm = DisplayHATMini(self.buffer, backlight_pwm=True)
         self.flipped = False
+        self._packer = RGB565Packer()
         self._pins = {
             Buttons.A: self.dhm.BUTTON_A,
             Buttons.B: self.dhm.BUTTON_B,
@@ -37,10 +104,24 @@ class PiDisplay:
     def set_flip(self, flipped):
         self.flipped = bool(flipped)
 
-    def show(self, image):
-        if self.flipped:
-            image = image.transpose(Image.Transpose.ROTATE_180)
-        self.dhm.st7789.display(image)
+    def show(self, image, dirty=None):
+        st = self.dhm.st7789
+        # The panel's own rotation and our flip combine into one; on the
+        # HAT (mounted at 180) a flipped unit needs no reordering at all
+        rotation = (st._rotation + (180 if self.flipped else 0)) % 360
+        if rotation not in (0, 180):
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
+            if self.flipped:
+                image = image.transpose(Image.Transpose.ROTATE_180)
+            st.display(image)
+            return
+        for box in [(0, 0, WIDTH, HEIGHT)] if dirty is None else dirty:
+            x0, y0, x1, y1 = _rotate_box(box, rotation)
+            st.set_window(x0, y0, x1 - 1, y1 - 1)
+            data = self._packer.pack(image, box, rotation)
+            for i in range(0, len(data), _SPI_CHUNK):
+                st.data(data[i:i + _SPI_CHUNK])
 
     def set_backlight(self, level):
         self.dhm.set_backlight(level)
@@ -65,14 +146,18 @@ class MockDisplay:
         self.save_dir = save_dir
         self.save_every = save_every
         self.frames = 0
+        self.pixels = 0         # pixels that would have gone over SPI
         self.flipped = False
 
     def set_flip(self, flipped):
         self.flipped = bool(flipped)
 
-    def show(self, image):
+    def show(self, image, dirty=None):
         self.frames += 1
+        self.pixels += regions.area(dirty)
         if self.save_dir and self.save_every and self.frames % self.save_every == 0:
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
             image.save(f"{self.save_dir}/frame_{self.frames:05d}.png")
 
     def set_backlight(self, level):
@@ -88,5 +173,150 @@ class MockDisplay:
         pass
 
 
+def _copy_frame(image, buf):
+    """Copy a frame into `buf` if it is a reusable buffer of the same kind
+    and size, else into a new one; returns the copy. Anything that is not
+    a frame is passed through."""
+    if isinstance(image, np.ndarray):
+        if not isinstance(buf, np.ndarray) or buf.shape != image.shape:
+            buf = np.empty_like(image)
+        np.copyto(buf, image)
+        return buf
+    if isinstance(image, Image.Image):
+        if not isinstance(buf, Image.Image) or (buf.mode, buf.size) != (image.mode, image.size):
+            return image.copy()
+        buf.paste(image)
+        return buf
+    return image
+
+
+def frame_digest(image):
+    """CRC32 of a frame's pixels, or None for anything that is not a frame."""
+    if isinstance(image, np.ndarray):
+        return zlib.crc32(np.ascontiguousarray(image))
+    if isinstance(image, Image.Image):
+        return zlib.crc32(image.tobytes())
+    return None
+
+
+class DisplayWriter:
+    """Owns the SPI push on a background thread.
+
+    Two slots: the frame being transferred and one pending frame. If the
+    renderer gets ahead of the bus the pending frame is replaced (latest
+    wins) and its dirty boxes are folded into the newer one, so nothing
+    is lost on the panel. `delivered` and `dropped` show which side is
+    the bottleneck.
+
+    `show()` copies the frame into one of two buffers the writer owns
+    (one in flight, one pending), so the caller may draw into its own
+    buffer again straight away, however far behind the bus is.
+
+    Before a push the frame is digested; if it matches the last frame
+    sent the transfer is skipped entirely and counted in `skipped`.
+    With a `profiler`, each transfer's duration goes to its bus ring.
+    """
+
+    profiler = None             # FrameProfiler, set by the app
+
+    def __init__(self, display):
+        self.display = display
+        self.delivered = 0
+        self.dropped = 0
+        self.skipped = 0
+        self._last = None           # digest of the frame on the panel
+        self._pending = None        # (image, dirty) waiting for the bus
+        self._spare = None          # owned buffer free for the next show()
+        self._busy = False
+        self._full = False          # next frame must be pushed whole
+        self._running = True
+        self._cond = threading.Condition()
+        self._io = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def show(self, image, dirty=None):
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+                buf, older = self._pending
+                if older is None or dirty is None:
+                    dirty = None
+                else:
+                    dirty = regions.merge([older, dirty])
+            else:
+                buf, self._spare = self._spare, None
+            self._pending = (_copy_frame(image, buf), dirty)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                image, dirty = self._pending
+                self._pending = None
+                self._busy = True
+            digest = frame_digest(image)
+            try:
+                if digest is not None and digest == self._last:
+                    self.skipped += 1
+                else:
+                    with self._io:
+                        # Checked under the bus lock so a flip between taking
+                        # the frame and pushing it still gets a whole frame
+                        with self._cond:
+                            if self._full:
+                                dirty, self._full = None, False
+                        start = time.perf_counter()
+                        self.display.show(image, dirty)
+                        if self.profiler:
+                            self.profiler.bus(time.perf_counter() - start)
+                        self._last = digest
+                    self.delivered += 1
+            except Exception as e:
+                # What the panel shows is unknown now, so resend it all
+                with self._cond:
+                    self._full = True
+                self._last = None
+                print(f"Display write failed: {e}")
+            with self._cond:
+                self._busy = False
+                self._spare = image
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every queued frame has gone out."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._pending is None and not self._busy, timeout)
+
+    def set_flip(self, flipped):
+        # Wait for any in-flight push so a frame is never half-rotated
+        with self._io:
+            self.display.set_flip(flipped)
+            self._last = None
+            with self._cond:
+                self._full = True
+
+    def set_backlight(self, level):
+        self.display.set_backlight(level)
+
+    def set_led(self, r, g, b):
+        self.display.set_led(r, g, b)
+
+    def pressed(self, name):
+        return self.display.pressed(name)
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        self.display.close()
+
+
 def make_display():
     return PiDisplay() if HAVE_HARDWARE else MockDisplay()
@@ -0,0 +1,121 @@
+"""Long-horizon local history of F&G and prices, kept across restarts.
+
+MarketData appends each new point it fetches (the daily F&G values and
+every coin's chart) to a SQLite file. Points are not kept raw: each one
+is folded into its bucket at every tier (hourly, daily, weekly), which
+holds the min, max, sum, count and last value. A chart of any range then
+reads from the finest tier with at most OVERSAMPLE rows per pixel, so a
+five-year chart is the same bounded index scan as a one-day one and
+nothing is aggregated at render time.
+
+Series only grow forwards: points at or before the newest one already
+recorded are ignored, so overlapping responses (a re-fetched 7-day
+chart, the 30-day F&G list) never count twice.
+"""
+
+import math
+import sqlite3
+import threading
+from array import array
+
+HOUR, DAY, WEEK = 3600, 86400, 7 * 86400
+TIERS = (HOUR, DAY, WEEK)       # bucket sizes in seconds, finest first
+# Rows per pixel a query may read before it steps up a tier
+OVERSAMPLE = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    name TEXT PRIMARY KEY,
+    newest REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    series TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    lo REAL NOT NULL,
+    hi REAL NOT NULL,
+    total REAL NOT NULL,
+    n INTEGER NOT NULL,
+    last REAL NOT NULL,
+    PRIMARY KEY (series, size, start)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO buckets (series, size, start, lo, hi, total, n, last)
+VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+ON CONFLICT (series, size, start) DO UPDATE SET
+    lo = min(lo, excluded.lo), hi = max(hi, excluded.hi),
+    total = total + excluded.total, n = n + 1, last = excluded.last
+"""
+
+
+def tier_for(span, width):
+    """Bucket size to draw `span` seconds across `width` pixels."""
+    for size in TIERS:
+        if span / size <= width * OVERSAMPLE:
+            return size
+    return TIERS[-1]
+
+
+class History:
+    """Tiered time-series store; safe to share between threads.
+
+    Series are named "fng" and "price:<coin id>". `path` defaults to an
+    in-memory database.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def newest(self, series):
+        """Epoch seconds of the newest recorded point, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT newest FROM series WHERE name = ?",
+                                   (series,)).fetchone()
+        return row and row[0]
+
+    def record(self, series, points):
+        """Append (epoch seconds, value) points, oldest first; returns how
+        many were new."""
+        added = 0
+        with self._lock, self._db:
+            row = self._db.execute("SELECT newest FROM series WHERE name = ?",
+                                   (series,)).fetchone()
+            newest = row[0] if row else -math.inf
+            for t, value in points:
+                if value is None or t <= newest:
+                    continue
+                for size in TIERS:
+                    start = int(t // size * size)
+                    self._db.execute(_UPSERT, (series, size, start, value, value, value,
+                                               value))
+                newest = t
+                added += 1
+            if added:
+                self._db.execute(
+                    "INSERT INTO series VALUES (?, ?)"
+                    " ON CONFLICT (name) DO UPDATE SET newest = excluded.newest",
+                    (series, newest))
+        return added
+
+    def query(self, series, start, end, width):
+        """Buckets of `series` between two epoch times, sized for `width`
+        pixels. Returns (bucket start, mean, low, high) `array('d')`s."""
+        size = tier_for(end - start, width)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT start, total / n, lo, hi FROM buckets"
+                " WHERE series = ? AND size = ? AND start BETWEEN ? AND ?"
+                " ORDER BY start",
+                (series, size, int(start // size * size), end)).fetchall()
+        return tuple(array("d", col) for col in zip(*rows)) or (
+            array("d"), array("d"), array("d"), array("d"))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
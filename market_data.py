@@ -3,39 +3,362 @@
 All network IO runs on a background thread so the render loop never
 stalls. Screens read the plain attributes; assignment is atomic under
 the GIL so no locking is needed for these simple swaps.
+
+Each source has its own cadence (`INTERVALS`): the price every minute,
+the daily F&G index hourly. A refresh issues the due fetches in parallel
+over one keep-alive session, so its wall time is the slowest request
+rather than the sum. Failures back off exponentially with jitter per
+source, a 429 pauses every source on that host for its Retry-After, and
+repeat requests are conditional (ETag/Last-Modified) so an unchanged
+resource costs a 304 instead of a body.
+
+Freshness is tracked per source: `last_update` is the last success of
+the stalest required source and `error` the first source still failing,
+so one healthy feed cannot hide another that has gone dark.
+
+With a cache path, the snapshot is written after every refresh that
+fetched anything and loaded on start-up, so a restarted display has
+data on its first frame instead of waiting for the network.
+
+Endpoints default to the public APIs but can be pointed anywhere, such
+as the `fakeapi.py` stand-in, with `endpoints=` or `endpoints_for(base)`.
+
+The 7-day chart is kept as a rolling hourly buffer of `array('d')`:
+after the first full download only the tail since the newest stored
+point is requested, and the response is streamed through a scanner
+that pulls out just the `prices` pairs, never building the JSON tree
+(or the market caps and volumes that follow them).
+
+With a `history` (a history.History), every new F&G value and chart
+point is also appended to the long-horizon local store as it arrives.
+
+Changes are versioned per group of fields (`versions`), so a screen can
+rebuild only when the data it actually draws has moved; `version` is
+the sum of all of them for anything that just wants "something changed".
+
+Several coins can be tracked at once. Each is an `Asset` in `assets`,
+keyed by CoinGecko id; the markets and GBP requests batch every coin
+into one call and only the chart is fetched per coin, so each extra
+coin costs one request. The first coin's fields are also readable (and
+writable) on the store itself, as they were when it only knew bitcoin.
 """
 
+import bisect
+import email.utils
+import json
+import os
+import random
+import re
 import threading
 import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 import requests
 
 FNG_URL = "https://api.alternative.me/fng/"
 CG_MARKETS = "https://api.coingecko.com/api/v3/coins/markets"
-CG_CHART = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart"
+CG_CHART = "https://api.coingecko.com/api/v3/coins/{id}/market_chart"
+CG_CHART_RANGE = CG_CHART + "/range"
 CG_SIMPLE = "https://api.coingecko.com/api/v3/simple/price"
+ENDPOINTS = {
+    "fng": FNG_URL,
+    "markets": CG_MARKETS,
+    "chart": CG_CHART,
+    "chart_range": CG_CHART_RANGE,
+    "gbp": CG_SIMPLE,
+}
+
+COINS = ("bitcoin",)            # CoinGecko ids; the first is the primary
 
-REFRESH_SECS = 300
+# Seconds between fetches of each source while it is healthy. The chart
+# is one source per coin, named "chart:<id>".
+INTERVALS = {"fng": 3600, "markets": 60, "chart": 300, "gbp": 300}
+REQUIRED = ("fng", "markets", "chart")     # GBP is nice-to-have
+RETRY_SECS = 30                 # first backoff after a failure, doubling
+MAX_BACKOFF = 1800
+JITTER = 0.1                    # +/- fraction, so desks behind one IP drift apart
 TIMEOUT = 8
+CHART_SPAN = 7 * 86400
+CHART_STEP = 3600
+CHUNK = 4096                    # streamed response read size
 
+# Version groups: which on-screen fields each counter in `versions`
+# covers. "status" tracks the staleness badge rather than any field.
+GROUPS = {
+    "fng": ("fng_value", "fng_label", "fng_history"),
+    "markets": ("price_usd", "change_24h", "high_24h", "low_24h", "volume_24h",
+                "symbol", "name"),
+    "chart": ("chart_7d",),
+    "gbp": ("price_gbp",),
+}
+ASSET_GROUPS = ("markets", "chart", "gbp")
+STORE_GROUPS = ("fng", "status")
+VERSION_GROUPS = tuple(GROUPS) + ("status",)
+ASSET_FIELDS = sum((GROUPS[g] for g in ASSET_GROUPS), ()) + ("chart_ts",)
+SNAPSHOT_FIELDS = GROUPS["fng"] + ("last_update",)
+ARRAY_FIELDS = ("chart_7d", "chart_ts")
 
-class MarketData:
-    def __init__(self):
-        self.fng_value = None          # int 0-100
-        self.fng_label = None          # classification string
-        self.fng_history = []          # last 30 values, oldest first
+_PRICES = b'"prices"'
+_PAIR = re.compile(rb'\s*,?\s*\[\s*([^,\s]+)\s*,\s*([^\]\s]+)\s*\]')
+_END = re.compile(rb'\s*\]')
+
+
+def endpoints_for(base):
+    """The default endpoints with their scheme and host swapped for `base`,
+    e.g. "http://127.0.0.1:8800" for a local stand-in."""
+    base = base.rstrip("/")
+    return {name: base + "/" + url.split("/", 3)[3] for name, url in ENDPOINTS.items()}
+
+
+def retry_after(value, now=None):
+    """Seconds from a Retry-After header (delta or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class RateLimited(Exception):
+    def __init__(self, wait):
+        super().__init__(f"rate limited for {wait:.0f}s")
+        self.wait = wait
+
+
+class Schedule:
+    """When one source is next due, with jittered exponential backoff."""
+
+    def __init__(self, interval, rng=random):
+        self.interval = interval
+        self.rng = rng
+        self.next_due = 0.0         # time.monotonic(); 0 means now
+        self.failures = 0
+
+    def _jitter(self, secs):
+        return secs * self.rng.uniform(1 - JITTER, 1 + JITTER)
+
+    def succeeded(self, now):
+        self.failures = 0
+        self.next_due = now + self._jitter(self.interval)
+
+    def failed(self, now, wait=None):
+        """Back off; `wait` (from Retry-After) is a floor, not a suggestion."""
+        self.failures += 1
+        backoff = self._jitter(min(MAX_BACKOFF, RETRY_SECS * 2 ** (self.failures - 1)))
+        self.next_due = now + max(backoff, wait or 0)
+
+    def defer(self, until):
+        self.next_due = max(self.next_due, until)
+
+
+def parse_prices(chunks):
+    """Stream the "prices" pairs of a market_chart body into two arrays.
+
+    `chunks` is an iterable of bytes (e.g. `iter_content`). Scanning
+    stops at the end of the prices array, so whatever follows is never
+    parsed. Null prices are skipped. Returns (ms, price) `array('d')`s.
+    """
+    ts, prices = array("d"), array("d")
+    buf = b""
+    inside = False
+    for chunk in chunks:
+        buf += chunk
+        if not inside:
+            i = buf.find(_PRICES)
+            j = buf.find(b"[", i) if i >= 0 else -1
+            if j < 0:
+                # Keep enough to catch the key split across two chunks
+                buf = buf[i:] if i >= 0 else buf[-len(_PRICES):]
+                continue
+            buf = buf[j + 1:]
+            inside = True
+        pos = 0
+        while True:
+            m = _PAIR.match(buf, pos)
+            if m is None:
+                break
+            if m.group(2) != b"null":
+                ts.append(float(m.group(1)))
+                prices.append(float(m.group(2)))
+            pos = m.end()
+        if _END.match(buf, pos):
+            return ts, prices
+        buf = buf[pos:]
+    raise ValueError("no complete prices array in response")
+
+
+def merge_chart(ts, prices, points, now):
+    """Append [ms, price] points to an hourly series and drop >7 day olds.
+
+    The newest stored point is provisional: until it is an hour past its
+    predecessor, newer points replace it rather than append, so the
+    series keeps hourly spacing but always ends on the latest price.
+    Returns new (ts, prices) arrays; the inputs are not modified.
+    """
+    ts, prices = array("d", ts), array("d", prices)
+    step = CHART_STEP * 1000
+    for t, p in points:
+        if p is None or (ts and t <= ts[-1]):
+            continue
+        if len(ts) >= 2 and ts[-1] - ts[-2] < step:
+            ts[-1], prices[-1] = t, p
+        else:
+            ts.append(t)
+            prices.append(p)
+    start = bisect.bisect_left(ts, (now - CHART_SPAN) * 1000)
+    return ts[start:], prices[start:]
+
+
+class Asset:
+    """One coin's fields within a MarketData store.
+
+    Screens can take an Asset in place of the store: anything that is not
+    per coin (the F&G index, staleness) reads through to the store, and
+    `versions` combines the store's groups with this coin's own.
+    """
+
+    def __init__(self, store, coin):
+        self._store = store
+        self.id = coin
+        self.symbol = None             # e.g. "BTC", once the API has answered
+        self.name = None
         self.price_usd = None
         self.price_gbp = None
         self.change_24h = None         # percent
         self.high_24h = None
         self.low_24h = None
         self.volume_24h = None
-        self.chart_7d = []             # hourly USD prices, oldest first
-        self.last_update = 0           # epoch of last successful refresh
-        self.error = None
-        self.version = 0               # bumped on every successful refresh
+        self.chart_7d = array("d")     # hourly USD prices, oldest first
+        self.chart_ts = array("d")     # epoch ms of each chart_7d point
+        self._versions = dict.fromkeys(ASSET_GROUPS, 0)
+
+    def __getattr__(self, name):
+        if name == "_store":
+            raise AttributeError(name)
+        return getattr(self._store, name)
+
+    @property
+    def versions(self):
+        return dict(self._store._versions, **self._versions)
+
+    @property
+    def version(self):
+        return sum(self.versions.values())
+
+    def touch(self, *groups):
+        """Mark groups as changed; store-wide groups go to the store."""
+        for g in groups:
+            if g in self._versions:
+                self._versions[g] += 1
+            else:
+                self._store.touch(g)
+
+
+def _primary(field):
+    return property(lambda self: getattr(self.primary, field),
+                    lambda self, value: setattr(self.primary, field, value))
+
+
+class MarketData:
+    # The primary coin's fields, as the store had before it held several
+    price_usd = _primary("price_usd")
+    price_gbp = _primary("price_gbp")
+    change_24h = _primary("change_24h")
+    high_24h = _primary("high_24h")
+    low_24h = _primary("low_24h")
+    volume_24h = _primary("volume_24h")
+    chart_7d = _primary("chart_7d")
+    chart_ts = _primary("chart_ts")
+
+    def __init__(self, cache_path=None, endpoints=None, coins=COINS, history=None):
+        self.fng_value = None          # int 0-100
+        self.fng_label = None          # classification string
+        self.fng_history = []          # last 30 values, oldest first
+        self.assets = {coin: Asset(self, coin) for coin in coins}
+        self.primary = self.assets[coins[0]]
+        self.last_update = 0           # epoch the stalest required source last succeeded
+        self.error = None              # first source still failing, if any
+        self._succeeded = {}           # source -> epoch of its last success
+        self._errors = {}              # source -> message while it is failing
+        self._snapshot_time = 0        # last_update of the loaded snapshot
+        self._versions = dict.fromkeys(STORE_GROUPS, 0)  # per-group change counters
+        self.timings = {}              # seconds per source for the last refresh
+        self.endpoints = dict(ENDPOINTS, **(endpoints or {}))
+        sources = ["fng", "markets", "gbp"] + ["chart:" + coin for coin in coins]
+        self.schedules = {name: Schedule(INTERVALS[name.partition(":")[0]])
+                          for name in sources}
+        self.not_modified = 0          # conditional requests answered 304
+        self._validators = {}          # (url, params) -> (ETag, Last-Modified)
+        self._session = requests.Session()
+        self._pool = ThreadPoolExecutor(max_workers=max(4, len(sources)),
+                                        thread_name_prefix="fetch")
         self._stop = threading.Event()
+        self._submit = threading.Lock()
         self._thread = None
+        self.history = history
+        self.cache_path = cache_path
+        self.cached = False            # showing a snapshot from a previous run
+        if cache_path:
+            self.load_snapshot()
+
+    def asset(self, coin=None):
+        """The Asset for a CoinGecko id; the primary coin by default."""
+        return self.primary if coin is None else self.assets[coin]
+
+    def load_snapshot(self):
+        try:
+            with open(self.cache_path) as f:
+                snap = json.load(f)
+            values = {k: snap[k] for k in SNAPSHOT_FIELDS}
+            versions = {g: snap["versions"].get(g, 0) for g in STORE_GROUPS}
+            # Single-coin snapshots kept the coin's fields at the top level
+            coins = {}
+            for coin, a in (snap.get("assets") or {self.primary.id: snap}).items():
+                if coin not in self.assets:
+                    continue
+                fields = {k: a.get(k) for k in ASSET_FIELDS}
+                for k in ARRAY_FIELDS:
+                    fields[k] = array("d", fields[k] or ())
+                fields["_versions"] = {g: a["versions"].get(g, 0) for g in ASSET_GROUPS}
+                coins[coin] = fields
+        except Exception:
+            return
+        for k, v in values.items():
+            setattr(self, k, v)
+        self._snapshot_time = self.last_update
+        self._versions = versions
+        for coin, fields in coins.items():
+            for k, v in fields.items():
+                setattr(self.assets[coin], k, v)
+        self.cached = True
+
+    def save_snapshot(self):
+        # Write then rename, so a crash mid-write never leaves a torn file
+        tmp = self.cache_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                snap = {k: getattr(self, k) for k in SNAPSHOT_FIELDS}
+                snap["versions"] = self._versions
+                snap["assets"] = {}
+                for coin, a in self.assets.items():
+                    fields = {k: getattr(a, k) for k in ASSET_FIELDS}
+                    for k in ARRAY_FIELDS:
+                        fields[k] = fields[k].tolist()
+                    fields["versions"] = a._versions
+                    snap["assets"][coin] = fields
+                json.dump(snap, f,
+                          separators=(",", ":"))
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            print(f"Could not save snapshot: {e}")
 
     def start(self):
         self._thread = threading.Thread(target=self._loop, daemon=True)
@@ -43,77 +366,241 @@ class MarketData:
 
     def stop(self):
         self._stop.set()
+        # Under the submit lock, so a refresh already underway on the loop
+        # thread either finishes submitting first or sees the stop
+        with self._submit:
+            self._pool.shutdown(wait=False)
 
     def _loop(self):
+        # A snapshot younger than a source's interval is as good as a
+        # fetch, so a crash loop does not hammer the APIs
+        if self.cached:
+            age = max(0.0, time.time() - self.last_update)
+            for sched in self.schedules.values():
+                sched.next_due = time.monotonic() + max(0.0, sched.interval - age)
         while not self._stop.is_set():
-            ok = self.refresh()
-            # Back off sooner on failure so the display recovers quickly
-            self._stop.wait(REFRESH_SECS if ok else 30)
-
-    def refresh(self):
-        ok = True
-        ok &= self._fetch_fng()
-        ok &= self._fetch_markets()
-        ok &= self._fetch_chart()
-        self._fetch_gbp()  # nice-to-have, failure is not fatal
-        if ok:
-            self.last_update = time.time()
-            self.error = None
-            self.version += 1
-        return ok
+            now = time.monotonic()
+            due = [name for name, s in self.schedules.items() if s.next_due <= now]
+            if due:
+                self.refresh(due)
+            wake = min(s.next_due for s in self.schedules.values())
+            self._stop.wait(max(1.0, wake - time.monotonic()))
 
-    def _fetch_fng(self):
+    def _timed(self, name, fetch, *args):
+        start = time.monotonic()
         try:
-            r = requests.get(FNG_URL, params={"limit": 30}, timeout=TIMEOUT)
-            r.raise_for_status()
-            data = r.json()["data"]
-            self.fng_value = int(data[0]["value"])
-            self.fng_label = data[0]["value_classification"]
-            self.fng_history = [int(d["value"]) for d in reversed(data)]
-            return True
-        except Exception as e:
-            self.error = f"F&G: {e}"
-            return False
+            return fetch(*args)
+        finally:
+            self.timings[name] = time.monotonic() - start
 
-    def _fetch_markets(self):
+    @property
+    def versions(self):
+        """Change counters of the store's groups and the primary coin's."""
+        return self.primary.versions
+
+    @property
+    def version(self):
+        """Bumped whenever any group changes."""
+        return sum(self.versions.values())
+
+    def touch_all(self):
+        """Mark every group changed, e.g. after filling fields by hand."""
+        self.touch(*VERSION_GROUPS)
+
+    def touch(self, *groups):
+        """Mark groups of fields as changed; per-coin groups on every coin."""
+        for g in groups:
+            if g in self._versions:
+                self._versions[g] += 1
+            else:
+                for a in self.assets.values():
+                    a._versions[g] += 1
+
+    def _source_groups(self, name):
+        """(owner, group) pairs of the fields a source writes."""
+        kind, _, coin = name.partition(":")
+        if kind == "fng":
+            return [(self, "fng")]
+        owners = [self.assets[coin]] if coin else self.assets.values()
+        return [(a, kind) for a in owners]
+
+    def _values(self, groups):
+        return [tuple(getattr(owner, k) for k in GROUPS[g]) for owner, g in groups]
+
+    def _status(self):
+        return self.cached, self.error is None, bool(self.last_update)
+
+    def refresh(self, sources=None):
+        """Fetch `sources` (default all) now, in parallel; True if none
+        required failed. Does nothing once stopped."""
+        sources = tuple(self.schedules) if sources is None else tuple(sources)
+        start = time.monotonic()
+        status = self._status()
+        with self._submit:
+            if self._stop.is_set():
+                return False
+            jobs = [self._pool.submit(self._timed, name, self._run_source, name)
+                    for name in sources]
+        results = dict(zip(sources, [job.result() for job in jobs]))
+        self.timings["total"] = time.monotonic() - start
+        required = [name for name in self.schedules if name.partition(":")[0] in REQUIRED]
+        self.last_update = min(self._succeeded.get(name, self._snapshot_time)
+                               for name in required)
+        self.error = next(iter(self._errors.values()), None)
+        if self.cached and all(name in self._succeeded for name in required):
+            self.cached = False
+        if self._status() != status:
+            self.touch("status")
+        if self.cache_path and any(results.values()):
+            self.save_snapshot()
+        return all(ok for name, ok in results.items() if name.partition(":")[0] in REQUIRED)
+
+    def _run_source(self, name):
+        """Fetch one source, version what it changed and reschedule it;
+        True on success."""
+        sched = self.schedules[name]
+        kind, _, coin = name.partition(":")
+        groups = self._source_groups(name)
+        before = self._values(groups)
         try:
-            r = requests.get(CG_MARKETS, params={
-                "ids": "bitcoin", "vs_currency": "usd",
-                "price_change_percentage": "24h",
-            }, timeout=TIMEOUT)
-            r.raise_for_status()
-            d = r.json()[0]
-            self.price_usd = d["current_price"]
-            self.change_24h = d["price_change_percentage_24h"]
-            self.high_24h = d["high_24h"]
-            self.low_24h = d["low_24h"]
-            self.volume_24h = d["total_volume"]
-            return True
+            fetch = getattr(self, "_fetch_" + kind)
+            fetch(coin) if coin else fetch()
+        except RateLimited as e:
+            # The limit is per client IP, so every source on that host waits
+            host = self._host(name)
+            until = time.monotonic() + e.wait
+            for other, s in self.schedules.items():
+                if other != name and self._host(other) == host:
+                    s.defer(until)
+            sched.failed(time.monotonic(), e.wait)
+            self._source_error(name, e)
+            return False
         except Exception as e:
-            self.error = f"Price: {e}"
+            sched.failed(time.monotonic())
+            self._source_error(name, e)
             return False
+        sched.succeeded(time.monotonic())
+        self._succeeded[name] = time.time()
+        self._errors.pop(name, None)
+        # Version here rather than per round: a round where another source
+        # failed must not swallow this one's changes
+        for (owner, g), old, new in zip(groups, before, self._values(groups)):
+            if old != new:
+                owner.touch(g)
+        return True
 
-    def _fetch_chart(self):
-        try:
-            r = requests.get(CG_CHART, params={
-                "vs_currency": "usd", "days": 7,
-            }, timeout=TIMEOUT)
+    def _host(self, source):
+        return urlsplit(self.endpoints[source.partition(":")[0]]).netloc
+
+    def _source_error(self, name, e):
+        kind, _, coin = name.partition(":")
+        label = {"fng": "F&G", "markets": "Price", "chart": "Chart"}.get(kind)
+        if coin and coin != self.primary.id:
+            label = f"{coin} chart"
+        if label:
+            self._errors[name] = f"{label}: {e}"
+
+    def _request(self, name, params, conditional=True, stream=False, coin=None):
+        """GET an endpoint; the response, or None if unchanged since last time.
+
+        `coin` fills the {id} of per-coin endpoints."""
+        url = self.endpoints[name].format(id=coin)
+        key = (url, tuple(sorted(params.items())))
+        headers = {}
+        etag, modified = self._validators.get(key, (None, None)) if conditional else (None, None)
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+        r = self._session.get(url, params=params, headers=headers, timeout=TIMEOUT,
+                              stream=stream)
+        if r.status_code == 304 and (etag or modified):
+            r.close()
+            self.not_modified += 1
+            return None
+        # A streamed response holds its pooled connection until closed
+        if r.status_code == 429:
+            r.close()
+            wait = retry_after(r.headers.get("Retry-After"))
+            raise RateLimited(RETRY_SECS if wait is None else wait)
+        if r.status_code >= 400:
+            r.close()
             r.raise_for_status()
-            self.chart_7d = [p[1] for p in r.json()["prices"]]
-            return True
-        except Exception as e:
-            self.error = f"Chart: {e}"
-            return False
+        if conditional:
+            validators = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            if any(validators):
+                self._validators[key] = validators
+        return r
 
-    def _fetch_gbp(self):
+    def _get(self, name, params, conditional=True):
+        """GET an endpoint's JSON; None if it is unchanged since last time."""
+        r = self._request(name, params, conditional)
+        return None if r is None else r.json()
+
+    def _fetch_fng(self):
+        body = self._get("fng", {"limit": 30})
+        if body is None:
+            return
+        data = body["data"]
+        self.fng_value = int(data[0]["value"])
+        self.fng_label = data[0]["value_classification"]
+        self.fng_history = [int(d["value"]) for d in reversed(data)]
+        if self.history:
+            self.history.record("fng", [(int(d["timestamp"]), int(d["value"]))
+                                        for d in reversed(data)])
+
+    def _fetch_markets(self):
+        # Every coin in one request
+        body = self._get("markets", {
+            "ids": ",".join(self.assets), "vs_currency": "usd",
+            "price_change_percentage": "24h",
+        })
+        if body is None:
+            return
+        if not body:
+            raise ValueError("no coins in response")
+        for d in body:
+            a = self.assets.get(d["id"])
+            if a is None:
+                continue
+            a.symbol = d["symbol"].upper()
+            a.name = d["name"]
+            a.price_usd = d["current_price"]
+            a.change_24h = d["price_change_percentage_24h"]
+            a.high_24h = d["high_24h"]
+            a.low_24h = d["low_24h"]
+            a.volume_24h = d["total_volume"]
+
+    def _fetch_chart(self, coin):
+        a = self.assets[coin]
+        now = time.time()
+        ts, prices = a.chart_ts, a.chart_7d
+        if ts and now - ts[-1] / 1000 < CHART_SPAN:
+            # Just the tail since the newest point we already have; the
+            # window moves every time, so there is nothing to revalidate
+            r = self._request("chart_range", {
+                "vs_currency": "usd", "from": int(ts[-1] / 1000), "to": int(now),
+            }, conditional=False, stream=True, coin=coin)
+        else:
+            ts, prices = (), ()
+            r = self._request("chart", {"vs_currency": "usd", "days": 7},
+                              conditional=False, stream=True, coin=coin)
         try:
-            r = requests.get(CG_SIMPLE, params={
-                "ids": "bitcoin", "vs_currencies": "gbp",
-            }, timeout=TIMEOUT)
-            r.raise_for_status()
-            self.price_gbp = r.json()["bitcoin"]["gbp"]
-        except Exception:
-            pass
+            new_ts, new_prices = parse_prices(r.iter_content(CHUNK))
+        finally:
+            r.close()
+        a.chart_ts, a.chart_7d = merge_chart(ts, prices, zip(new_ts, new_prices), now)
+        if self.history:
+            self.history.record("price:" + coin,
+                                zip((t / 1000 for t in new_ts), new_prices))
+
+    def _fetch_gbp(self):
+        body = self._get("gbp", {"ids": ",".join(self.assets), "vs_currencies": "gbp"})
+        if body is None:
+            return
+        for coin, prices in body.items():
+            if coin in self.assets:
+                self.assets[coin].price_gbp = prices["gbp"]
 
     def stale_minutes(self):
         if not self.last_update:
@@ -0,0 +1,104 @@
+"""Frame-timing instrumentation for the main loop.
+
+The loop calls `begin()` at the top of a frame and `mark(phase)` after
+each phase; `end()` files the frame. If the loop idles between frames,
+`begin()` charges the gap to "sleep" and files the previous frame
+itself. Timings land in fixed-size ring buffers so percentiles always
+describe the last few seconds.
+
+The SPI transfer happens on the display writer's thread, off the frame,
+so the writer reports each push with `bus()` into a ring of its own.
+"""
+
+import time
+
+import numpy as np
+
+PHASES = ("update", "render", "transition", "show", "sleep")
+HISTORY = 256
+
+
+class Ring:
+    """Fixed-size ring buffer of floats."""
+
+    def __init__(self, size=HISTORY):
+        self.buf = np.zeros(size)
+        self.count = 0
+
+    def add(self, value):
+        self.buf[self.count % len(self.buf)] = value
+        self.count += 1
+
+    def values(self):
+        return self.buf[:min(self.count, len(self.buf))]
+
+    def percentile(self, q):
+        vals = self.values()
+        return float(np.percentile(vals, q)) if len(vals) else 0.0
+
+
+class FrameProfiler:
+    def __init__(self, budget=1 / 30):
+        self.budget = budget
+        self.phases = {p: Ring() for p in PHASES}
+        self.work = Ring()          # frame time excluding sleep
+        self.interval = Ring()      # start-to-start, for FPS
+        self.push = Ring()          # panel transfers, timed by the writer
+        self.rebuilds = {}          # screen name -> Ring of static build times
+        self.frames = 0
+        self.late = 0               # frames whose work overran the budget
+        self._marks = dict.fromkeys(PHASES, 0.0)
+        self._start = None
+        self._t = None
+        self._open = False
+
+    def begin(self):
+        if self._open:
+            self.mark("sleep")
+            self.end()
+        now = time.perf_counter()
+        if self._start is not None:
+            self.interval.add(now - self._start)
+        self._start = self._t = now
+        self._open = True
+        for p in PHASES:
+            self._marks[p] = 0.0
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        now = time.perf_counter()
+        self._marks[phase] += now - self._t
+        self._t = now
+
+    def end(self):
+        self._open = False
+        for p in PHASES:
+            self.phases[p].add(self._marks[p])
+        work = self._t - self._start - self._marks["sleep"]
+        self.work.add(work)
+        self.frames += 1
+        if work > self.budget:
+            self.late += 1
+
+    def bus(self, secs):
+        """Record one panel transfer; called from the writer thread."""
+        self.push.add(secs)
+
+    def rebuild(self, name, secs):
+        self.rebuilds.setdefault(name, Ring(32)).add(secs)
+
+    def fps(self):
+        vals = self.interval.values()
+        return 1 / vals.mean() if len(vals) and vals.mean() > 0 else 0.0
+
+    def stats(self):
+        """Per-phase p50/p95/p99 in milliseconds, plus counters."""
+        out = {p: {q: r.percentile(q) * 1000 for q in (50, 95, 99)}
+               for p, r in self.phases.items()}
+        out["work"] = {q: self.work.percentile(q) * 1000 for q in (50, 95, 99)}
+        out["bus"] = {q: self.push.percentile(q) * 1000 for q in (50, 95, 99)}
+        out["rebuild"] = {name: r.percentile(50) * 1000 for name, r in self.rebuilds.items()}
+        out["fps"] = self.fps()
+        out["frames"] = self.frames
+        out["late"] = self.late
+        return out
@@ -0,0 +1,108 @@
+"""Dirty-rectangle bookkeeping for partial display updates.
+
+Screens report the boxes they draw over their cached layer each frame;
+`merge` coalesces those onto a coarse tile grid so the display can push
+a handful of SPI windows instead of the whole 320x240 frame.
+"""
+
+import math
+
+import numpy as np
+
+from theme import WIDTH, HEIGHT
+
+TILE = 16
+COLS = -(-WIDTH // TILE)
+ROWS = -(-HEIGHT // TILE)
+# Above this fraction of dirty tiles a single full-frame push is cheaper
+# than the per-window command overhead.
+FULL_RATIO = 0.6
+
+
+def box(x0, y0, x1, y1, pad=1):
+    """Integer (x0, y0, x1, y1) box grown by `pad`, x1/y1 exclusive."""
+    return (int(math.floor(x0)) - pad, int(math.floor(y0)) - pad,
+            int(math.ceil(x1)) + 1 + pad, int(math.ceil(y1)) + 1 + pad)
+
+
+def points_box(pts, pad=1):
+    """Bounding box of a sequence of (x, y) points."""
+    xs = [p[0] for p in pts]
+    ys = [p[1] for p in pts]
+    return box(min(xs), min(ys), max(xs), max(ys), pad)
+
+
+def arc_boxes(cx, cy, r, a0, a1, width=1, n=6):
+    """Cover an arc (PIL angles, degrees) with `n` small boxes."""
+    boxes = []
+    step = (a1 - a0) / n
+    # The chord box misses the arc's bulge, so pad by the sagitta too
+    pad = width + 1 + math.ceil(r * (1 - math.cos(math.radians(step) / 2)))
+    for i in range(n):
+        pts = []
+        for a in (a0 + i * step, a0 + (i + 1) * step):
+            rad = math.radians(a)
+            pts.append((cx + r * math.cos(rad), cy + r * math.sin(rad)))
+        boxes.append(points_box(pts, pad=pad))
+    return boxes
+
+
+def area(boxes):
+    """Total pixel area of a list of boxes (None means the full frame)."""
+    if boxes is None:
+        return WIDTH * HEIGHT
+    return sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+
+
+def as_array(boxes):
+    """Stack a mix of (x0, y0, x1, y1) tuples and Nx4 arrays into one Nx4 array."""
+    parts = [np.asarray(b, dtype=np.float64).reshape(-1, 4) for b in boxes]
+    parts = [p for p in parts if len(p)]
+    return np.concatenate(parts) if parts else np.empty((0, 4))
+
+
+def merge(boxes, full_ratio=FULL_RATIO):
+    """Coalesce boxes into a few tile-aligned windows.
+
+    `boxes` may mix single (x0, y0, x1, y1) tuples and Nx4 arrays.
+    Returns a list of boxes clipped to the screen, or None when the
+    dirty area is large enough that a full-frame push is cheaper.
+    """
+    arr = as_array(boxes)
+    if not len(arr):
+        return []
+    c0 = np.clip(np.floor(arr[:, 0] / TILE), 0, COLS).astype(int)
+    r0 = np.clip(np.floor(arr[:, 1] / TILE), 0, ROWS).astype(int)
+    c1 = np.clip(np.ceil(arr[:, 2] / TILE), 0, COLS).astype(int)
+    r1 = np.clip(np.ceil(arr[:, 3] / TILE), 0, ROWS).astype(int)
+    keep = (c1 > c0) & (r1 > r0)
+    c0, r0, c1, r1 = c0[keep], r0[keep], c1[keep], r1[keep]
+
+    # 2-D difference array: mark every box in one vectorised pass
+    diff = np.zeros((ROWS + 1, COLS + 1), dtype=np.int32)
+    np.add.at(diff, (r0, c0), 1)
+    np.add.at(diff, (r0, c1), -1)
+    np.add.at(diff, (r1, c0), -1)
+    np.add.at(diff, (r1, c1), 1)
+    grid = diff.cumsum(0).cumsum(1)[:ROWS, :COLS] > 0
+    if grid.mean() > full_ratio:
+        return None
+
+    # Horizontal runs per tile row, stacked while consecutive rows match
+    rects = []
+    open_runs = {}
+    for r in range(ROWS):
+        row = np.concatenate(([0], grid[r].view(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(row))
+        runs = {}
+        for a, b in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            rect = open_runs.get((a, b))
+            if rect is None:
+                rect = [a, r, b, r + 1]
+                rects.append(rect)
+            else:
+                rect[3] = r + 1
+            runs[(a, b)] = rect
+        open_runs = runs
+    return [(a * TILE, r * TILE, min(WIDTH, b * TILE), min(HEIGHT, s * TILE))
+            for a, r, b, s in rects]
@@ -32,7 +32,7 @@ def sample_data():
     base = 61500
     data.chart_7d = [base + 2200 * (i / 168) + 900 * ((i * 7919) % 100 / 100 - 0.5)
                      for i in range(168)]
-    data.version = 1
+    data.touch_all()
     data.last_update = __import__("time").time()
     return data
 
@@ -65,7 +65,7 @@ def main():
         dt = 1 / FPS
         for _ in range(FPS * SECONDS):
             screen.update(dt)
-            frames.append(screen.render())
+            frames.append(screen.render().copy())
 
         still = os.path.join(OUT_DIR, f"{name}.png")
         frames[-1].save(still)
@@ -1,15 +1,31 @@
 """Procedurally rendered, animated screens for the Display HAT Mini.
 
-Each screen keeps a cached static layer (rebuilt only when fresh data
-arrives) and draws cheap dynamic elements on a copy every frame, so the
-Pi Zero 2 W can sustain a smooth frame rate without pre-baked GIFs.
+Each screen composites three kinds of layer:
+
+- static: built by `_build_static`, only when the data groups listed in
+  DEPENDS change;
+- semi-static: small pieces listed by `layers()` (the stale badge, a
+  settled price, a settings row), each redrawn onto the base only when
+  its own key changes;
+- dynamic: needles, dots and embers drawn every frame.
+
+Frames are rendered into a small ring of persistent buffers. Each
+render restores only the boxes drawn into that buffer last time from the
+base, rather than copying the whole static layer, so the Pi Zero 2 W can
+sustain a smooth frame rate without pre-baked GIFs. Every render also
+records the boxes that changed in `dirty` so the display only has to
+push those regions.
 """
 
 import math
+import time
 
 from PIL import Image, ImageDraw
 
 import fx
+import geometry
+import raster
+import regions
 import theme
 from theme import WIDTH, HEIGHT
 
@@ -17,51 +33,200 @@ BG = fx.vertical_gradient(theme.BG_TOP, theme.BG_BOTTOM)
 
 
 def _centred(draw, xy, text, fnt, fill):
-    box = draw.textbbox((0, 0), text, font=fnt)
-    draw.text((xy[0] - (box[2] - box[0]) / 2 - box[0], xy[1]), text, font=fnt, fill=fill)
+    """Draw text centred on xy[0]; returns the box it covers."""
+    box = fx.text_bbox(text, fnt)
+    x = xy[0] - (box[2] - box[0]) / 2 - box[0]
+    draw.text((x, xy[1]), text, font=fnt, fill=fill)
+    return regions.box(x + box[0], xy[1] + box[1], x + box[2], xy[1] + box[3])
 
 
 def _right(draw, xy, text, fnt, fill):
-    box = draw.textbbox((0, 0), text, font=fnt)
-    draw.text((xy[0] - (box[2] - box[0]), xy[1]), text, font=fnt, fill=fill)
+    """Draw text right-aligned on xy[0]; returns the box it covers."""
+    box = fx.text_bbox(text, fnt)
+    x = xy[0] - (box[2] - box[0])
+    draw.text((x, xy[1]), text, font=fnt, fill=fill)
+    return regions.box(x + box[0], xy[1] + box[1], x + box[2], xy[1] + box[3])
+
+
+def _money(value, sign="$"):
+    """Whole units for big prices, cents below 100 so small coins still read."""
+    return f"{sign}{value:,.0f}" if abs(value) >= 100 else f"{sign}{value:,.2f}"
 
 
 def _stale_badge(draw, data):
+    """Draw the connection badge, if any; returns the box it covers."""
+    mins = data.stale_minutes()
+    if mins is None:
+        return _right(draw, (WIDTH - 8, 6), "CONNECTING...", theme.font("regular", 11),
+                      theme.GREY)
+    if data.cached and mins <= 15:
+        return _right(draw, (WIDTH - 8, 6), "CACHED", theme.font("regular", 11), theme.GREY)
+    if mins > 15:
+        return _right(draw, (WIDTH - 8, 6), f"OFFLINE {int(mins)}m",
+                      theme.font("regular", 11), theme.RED)
+    return None
+
+
+def _badge_key(data):
+    """What the stale badge currently says, for the badge layer key."""
     mins = data.stale_minutes()
     if mins is None:
-        _right(draw, (WIDTH - 8, 6), "CONNECTING...", theme.font("regular", 11), theme.GREY)
-    elif mins > 15:
-        _right(draw, (WIDTH - 8, 6), f"OFFLINE {int(mins)}m", theme.font("regular", 11), theme.RED)
+        return "CONNECTING"
+    if data.cached and mins <= 15:
+        return "CACHED"
+    return int(mins) if mins > 15 else None
+
+
+def _badge_layer(data):
+    def draw(img):
+        return _stale_badge(ImageDraw.Draw(img), data)
+    return "badge", _badge_key(data), draw
 
 
 class Screen:
+    """Base screen: layer bookkeeping, frame ring and dirty tracking.
+
+    `render()` returns one of RING buffers owned by the screen; it stays
+    valid for RING - 1 further renders, so copy it to keep it longer.
+    The display writer copies what it is handed, so it never holds one.
+    """
+
     title = ""
+    # MarketData version groups the static layer draws; None means all
+    DEPENDS = None
+    profiler = None             # FrameProfiler, set by the app
+    FPS = 30                    # frame rate while animating
+    IDLE_FPS = 30               # frame rate once the screen has settled
+    # The frame being drawn and the previous one, so callers can diff them
+    RING = 2
+    # Past this many boxes one full-frame paste beats restoring each box
+    RESTORE_MAX = 8
 
     def __init__(self, data):
         self.data = data
         self.t = 0.0
-        self._built_version = -1
+        self._built_key = None
         self._static = None
+        self._base = None       # static with the semi-static layers drawn in
+        self._layer_keys = {}   # layer name -> key it was drawn with
+        self._layer_boxes = {}  # layer name -> box it covers on the base
+        self._changed = []      # layer boxes redrawn since the last frame
+        self._bufs = []         # [image, boxes to restore, None = all]
+        self._next = 0
+        self._buf = None
+        self._drawn = None      # boxes drawn over the base last frame
+        self.dirty = None       # regions changed since last frame, None = all
 
     def on_enter(self):
         self.t = 0.0
+        self._drawn = None
+
+    def animating(self):
+        """True while something on screen needs the full frame rate."""
+        return True
+
+    def fps(self):
+        """Frames per second this screen wants in its current state."""
+        return self.FPS if self.animating() else self.IDLE_FPS
+
+    def _static_key(self):
+        if self.DEPENDS is None:
+            return self.data.version
+        return tuple(self.data.versions[g] for g in self.DEPENDS)
 
     def update(self, dt):
         self.t += dt
-        if self._built_version != self.data.version:
+        key = self._static_key()
+        if self._built_key != key:
+            start = time.perf_counter()
             self._static = self._build_static()
-            self._built_version = self.data.version
+            if self.profiler:
+                self.profiler.rebuild(type(self).__name__, time.perf_counter() - start)
+            self._built_key = key
+            self._base = None
+            self._drawn = None
 
     def _build_static(self):
         return BG.copy()
 
+    def layers(self):
+        """Semi-static layers as (name, key, draw) triples.
+
+        `draw(img)` paints the layer onto the base and returns the box
+        it covered, or None. It only runs when `key` changes. Layers
+        must not overlap one another.
+        """
+        return ()
+
+    def _refresh_layers(self):
+        static = self._static or BG
+        if self._base is None:
+            self._base = static.copy()
+            self._layer_keys.clear()
+            self._layer_boxes.clear()
+            for buf in self._bufs:
+                buf[1] = None
+        for name, key, draw in self.layers():
+            if name in self._layer_keys and self._layer_keys[name] == key:
+                continue
+            old = self._layer_boxes.pop(name, None)
+            if old:
+                self._base.paste(static.crop(old), old[:2])
+            new = draw(self._base)
+            self._layer_keys[name] = key
+            changed = [b for b in (old, new) if b]
+            if new:
+                self._layer_boxes[name] = new
+            self._changed += changed
+            for buf in self._bufs:
+                if buf[1] is not None:
+                    buf[1] += changed
+
+    def _frame(self):
+        """The next ring buffer, restored to the current base."""
+        self._refresh_layers()
+        if len(self._bufs) < self.RING:
+            self._bufs.append([self._base.copy(), []])
+            buf = self._bufs[-1]
+        else:
+            buf = self._bufs[self._next]
+            self._next = (self._next + 1) % self.RING
+            restore = None if buf[1] is None else regions.as_array(buf[1])
+            if restore is None or len(restore) > self.RESTORE_MAX:
+                buf[0].paste(self._base)
+            else:
+                for box in restore.astype(int).tolist():
+                    buf[0].paste(self._base.crop(box), box[:2])
+        buf[1] = []
+        self._buf = buf
+        return buf[0]
+
+    def _mark(self, boxes):
+        """Record this frame's dynamic boxes and work out what changed.
+
+        Both the previous and the current boxes are dirty: the old
+        positions need the base restored, the new ones drawn. So is
+        any semi-static layer redrawn since the last frame.
+        """
+        if self._drawn is None:
+            self.dirty = None
+        else:
+            self.dirty = regions.merge(self._drawn + boxes + self._changed)
+        self._drawn = boxes
+        self._changed = []
+        self._buf[1] = list(boxes)
+
     def render(self):
-        return self._static.copy() if self._static else BG.copy()
+        frame = self._frame()
+        self._mark([])
+        return frame
 
 
 class GaugeScreen(Screen):
     """Animated fear & greed dial with eased needle and history strip."""
 
+    DEPENDS = ("fng",)
+    IDLE_FPS = 15               # slow embers still look smooth at half rate
     CX, CY = 160, 168
     R_OUT = 116
     ARC_W = 18
@@ -82,6 +247,14 @@ class GaugeScreen(Screen):
         self.shown += (target - self.shown) * min(1.0, dt * 3.5)
         self.particles.update(dt)
 
+    def animating(self):
+        target = self.data.fng_value if self.data.fng_value is not None else 50
+        # Needle still sweeping, or the pulse ring expanding
+        return abs(target - self.shown) > 0.3 or self.t % 5.0 < 2.5
+
+    def layers(self):
+        return (_badge_layer(self.data),)
+
     def _build_static(self):
         img = BG.copy()
         d = ImageDraw.Draw(img)
@@ -90,14 +263,11 @@ class GaugeScreen(Screen):
         self.particles.set_colour(colour, theme.BG_BOTTOM)
 
         _centred(d, (160, 5), "BITCOIN FEAR & GREED", theme.font("regular", 13), theme.GREY)
-        _stale_badge(d, self.data)
 
-        # Gradient arc, one degree at a time
-        box = (self.CX - self.R_OUT, self.CY - self.R_OUT,
-               self.CX + self.R_OUT, self.CY + self.R_OUT)
-        for v in range(100):
-            a0 = 180 + v * 1.8
-            d.arc(box, a0, a0 + 2.0, fill=theme.gauge_colour(v + 0.5), width=self.ARC_W)
+        # Gradient arc, precomputed once per size
+        arc = fx.gradient_arc(self.R_OUT, self.ARC_W, tuple(theme.GAUGE_STOPS))
+        c = self.R_OUT + 1
+        img.paste(arc, (self.CX - c, self.CY - c), arc)
 
         # Tick marks at the zone boundaries
         for v in (0, 25, 45, 55, 75, 100):
@@ -135,11 +305,12 @@ class GaugeScreen(Screen):
         return img
 
     def render(self):
-        frame = self._static.copy() if self._static else BG.copy()
+        frame = self._frame()
         d = ImageDraw.Draw(frame)
         _, colour = theme.zone_for(self.data.fng_value)
 
-        self.particles.draw(d)
+        self.particles.draw(frame)
+        boxes = [self.particles.boxes()]
 
         # Expanding pulse ring every few seconds
         p = (self.t % 5.0) / 5.0
@@ -149,6 +320,7 @@ class GaugeScreen(Screen):
             if pr > 12:
                 d.arc((self.CX - pr, self.CY - pr, self.CX + pr, self.CY + pr),
                       180, 360, fill=ring, width=2)
+                boxes += regions.arc_boxes(self.CX, self.CY, pr, 180, 360, width=2)
 
         # Needle with a faint breathing wobble
         ang = math.radians(180 + (self.shown + math.sin(self.t * 1.7) * 0.6) * 1.8)
@@ -162,21 +334,28 @@ class GaugeScreen(Screen):
                   outline=theme.WHITE, width=2)
         tipc = fx.lerp_colour(theme.WHITE, colour, 0.5 + 0.5 * fx.pulse(self.t, 1.6))
         d.ellipse((tip[0] - 3, tip[1] - 3, tip[0] + 3, tip[1] + 3), fill=tipc)
+        boxes.append(regions.points_box(
+            [(self.CX - 8, self.CY - 8), (self.CX + 8, self.CY + 8),
+             (tip[0] - 4, tip[1] - 4), (tip[0] + 4, tip[1] + 4)]))
+        self._mark(boxes)
         return frame
 
 
 class PriceScreen(Screen):
-    """Big count-up price, 24h change pill and 7-day sparkline."""
+    """Big count-up price, 24h change pill and 7-day sparkline for one
+    coin (`coin`, a CoinGecko id; the data's primary coin by default)."""
 
+    DEPENDS = ("markets", "gbp", "chart")
+    IDLE_FPS = 15
     SPARK = (16, 142, 304, 210)  # left, top, right, bottom
 
-    def __init__(self, data):
-        super().__init__(data)
+    def __init__(self, data, coin=None):
+        super().__init__(data.asset(coin))
         self.shown_price = 0.0
         self.anim_from = 0.0
         self.anim_t = 1.0
         self._last_price = None
-        self._pts = []
+        self._line = geometry.Polyline(())
 
     def on_enter(self):
         super().on_enter()
@@ -195,19 +374,26 @@ class PriceScreen(Screen):
             self.anim_t = min(1.0, self.anim_t + dt / 1.2)
             self.shown_price = fx.lerp(self.anim_from, price, fx.ease_out_cubic(self.anim_t))
 
-    def _spark_points(self):
-        prices = fx.downsample(self.data.chart_7d, 64)
+    def animating(self):
+        return self.data.price_usd is not None and self.anim_t < 1.0
+
+    def layers(self):
+        # Once the count-up settles the price only changes with new data
+        price = None if self.animating() else self.data.price_usd
+
+        def draw_price(img):
+            if price is None:
+                return None
+            return fx.draw_text(img, (160, 40), _money(price), theme.font("bold", 44),
+                                theme.WHITE, align="centre", atlas=True)
+        return _badge_layer(self.data), ("price", price, draw_price)
+
+    def _spark_line(self):
+        x0, _, x1, _ = self.SPARK
+        xs, prices = fx.downsample(self.data.chart_7d, x1 - x0)
         if len(prices) < 2:
-            return []
-        x0, y0, x1, y1 = self.SPARK
-        lo, hi = min(prices), max(prices)
-        span = (hi - lo) or 1
-        pts = []
-        for i, p in enumerate(prices):
-            x = x0 + (x1 - x0) * i / (len(prices) - 1)
-            y = y1 - (y1 - y0) * (p - lo) / span
-            pts.append((x, y))
-        return pts
+            return geometry.Polyline(())
+        return geometry.Polyline(geometry.map_series(prices, self.SPARK, xs=xs))
 
     def _build_static(self):
         img = BG.copy()
@@ -215,10 +401,10 @@ class PriceScreen(Screen):
         data = self.data
 
         # Coin badge and title
-        d.ellipse((14, 8, 38, 32), fill=theme.GOLD)
-        _centred(d, (26, 9), "B", theme.font("bold", 17), (40, 26, 4))
-        d.text((46, 12), "BITCOIN", font=theme.font("bold", 14), fill=theme.WHITE)
-        _stale_badge(d, data)
+        symbol, name, colour, ink = theme.asset_style(data.id, data.symbol, data.name)
+        d.ellipse((14, 8, 38, 32), fill=colour)
+        _centred(d, (26, 9), symbol[0], theme.font("bold", 17), ink)
+        d.text((46, 12), name, font=theme.font("bold", 14), fill=theme.WHITE)
 
         # 24h change pill (price text itself is dynamic)
         chg = data.change_24h
@@ -227,7 +413,7 @@ class PriceScreen(Screen):
             pc = theme.GREEN if up else theme.RED
             txt = f"{chg:+.2f}%  24H"
             fnt = theme.font("bold", 15)
-            tw = d.textbbox((0, 0), txt, font=fnt)[2]
+            tw = fx.text_bbox(txt, fnt)[2]
             x0 = 160 - (tw + 34) / 2
             d.rounded_rectangle((x0, 92, x0 + tw + 34, 116), 12,
                                 fill=fx.lerp_colour(theme.BG_BOTTOM, pc, 0.22))
@@ -239,60 +425,72 @@ class PriceScreen(Screen):
             d.text((x0 + 28, 95), txt, font=fnt, fill=pc)
 
         if data.price_gbp:
-            _centred(d, (160, 120), f"£{data.price_gbp:,.0f}",
+            _centred(d, (160, 120), _money(data.price_gbp, "£"),
                      theme.font("regular", 13), theme.GREY)
 
         # Sparkline with soft area fill
-        pts = self._spark_points()
-        self._pts = pts
-        if pts:
+        self._line = self._spark_line()
+        if len(self._line):
             up = data.chart_7d[-1] >= data.chart_7d[0]
             line = theme.GREEN if up else theme.RED
             x0, y0, x1, y1 = self.SPARK
-            d.polygon(pts + [(x1, y1), (x0, y1)],
-                      fill=fx.lerp_colour(theme.BG_BOTTOM, line, 0.16))
-            d.line(pts, fill=line, width=2, joint="curve")
+            raster.fill_under(img, self._line.pts, y1, line, (0.3, 0.06))
+            raster.polyline(img, self._line.pts, line, width=2)
             d.text((x0, y0 - 14), "7D", font=theme.font("regular", 10), fill=theme.DIM)
 
         if data.high_24h and data.low_24h:
-            d.text((16, 218), f"24H HIGH  ${data.high_24h:,.0f}",
+            d.text((16, 218), f"24H HIGH  {_money(data.high_24h)}",
                    font=theme.font("regular", 12), fill=theme.GREY)
-            _right(d, (304, 218), f"LOW  ${data.low_24h:,.0f}",
+            _right(d, (304, 218), f"LOW  {_money(data.low_24h)}",
                    theme.font("regular", 12), theme.GREY)
         return img
 
     def render(self):
-        frame = self._static.copy() if self._static else BG.copy()
+        frame = self._frame()
         d = ImageDraw.Draw(frame)
 
+        # Cached sprites: the count-up is composed glyph by glyph
+        boxes = []
         if self.data.price_usd is None:
             shimmer = fx.lerp_colour(theme.DIM, theme.WHITE, fx.pulse(self.t, 1.4))
-            _centred(d, (160, 48), "LOADING...", theme.font("bold", 30), shimmer)
-        else:
-            _centred(d, (160, 40), f"${self.shown_price:,.0f}",
-                     theme.font("bold", 44), theme.WHITE)
+            boxes.append(fx.draw_text(frame, (160, 48), "LOADING...", theme.font("bold", 30),
+                                      shimmer, align="centre"))
+        elif self.animating():
+            boxes.append(fx.draw_text(frame, (160, 40), _money(self.shown_price),
+                                      theme.font("bold", 44), theme.WHITE,
+                                      align="centre", atlas=True))
 
         # Bright dot travelling along the sparkline
-        if self._pts:
+        if len(self._line):
             tt = (self.t % 6.0) / 6.0
-            x, y = fx.polyline_at(self._pts, tt)
+            x, y = self._line.at(tt)
             up = self.data.chart_7d[-1] >= self.data.chart_7d[0]
             c = theme.GREEN if up else theme.RED
             d.ellipse((x - 5, y - 5, x + 5, y + 5),
                       fill=fx.lerp_colour(theme.BG_BOTTOM, c, 0.35))
             d.ellipse((x - 2.5, y - 2.5, x + 2.5, y + 2.5), fill=theme.WHITE)
+            boxes.append(regions.box(x - 5, y - 5, x + 5, y + 5))
+        self._mark(boxes)
         return frame
 
 
 class ChartScreen(Screen):
-    """Full-bleed 7-day chart with an animated draw-in."""
+    """Full-bleed 7-day chart of one coin with an animated draw-in."""
 
+    DEPENDS = ("chart", "markets")
+    IDLE_FPS = 12               # only the slow crosshair moves after draw-in
     AREA = (10, 42, 310, 196)
     DRAW_IN_SECS = 1.1
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._pts = []
+    def __init__(self, data, coin=None):
+        super().__init__(data.asset(coin))
+        self._line = geometry.Polyline(())
+
+    def animating(self):
+        return self.t < self.DRAW_IN_SECS
+
+    def layers(self):
+        return (_badge_layer(self.data),)
 
     def _build_static(self):
         img = BG.copy()
@@ -300,19 +498,19 @@ class ChartScreen(Screen):
         data = self.data
         x0, y0, x1, y1 = self.AREA
 
-        d.text((12, 6), "BTC / USD", font=theme.font("bold", 14), fill=theme.WHITE)
+        symbol = theme.asset_style(data.id, data.symbol, data.name)[0]
+        d.text((12, 6), f"{symbol} / USD", font=theme.font("bold", 14), fill=theme.WHITE)
         d.text((12, 24), "7 DAY CHART", font=theme.font("regular", 11), fill=theme.GREY)
-        _stale_badge(d, data)
 
-        prices = fx.downsample(data.chart_7d, 90)
+        # M4 keeps each column's true extremes, so H/L below are exact
+        xs, prices = fx.downsample(data.chart_7d, x1 - x0)
         if len(prices) < 2:
             _centred(d, (160, 110), "NO CHART DATA", theme.font("bold", 18), theme.GREY)
-            self._pts = []
+            self._line = geometry.Polyline(())
             return img
 
-        lo, hi = min(prices), max(prices)
-        span = (hi - lo) or 1
-        pad = span * 0.08
+        lo, hi = prices.min(), prices.max()
+        pad = ((hi - lo) or 1) * 0.08
         lo, hi = lo - pad, hi + pad
         span = hi - lo
 
@@ -322,31 +520,27 @@ class ChartScreen(Screen):
             for gx in range(x0, x1, 8):
                 d.point((gx, gy), fill=theme.DIM)
 
-        pts = []
-        for i, p in enumerate(prices):
-            x = x0 + (x1 - x0) * i / (len(prices) - 1)
-            y = y1 - (y1 - y0) * (p - lo) / span
-            pts.append((x, y))
-        self._pts = pts
+        pts = geometry.map_series(prices, self.AREA, lo, hi, xs)
+        self._line = geometry.Polyline(pts)
 
         up = prices[-1] >= prices[0]
         line = theme.GREEN if up else theme.RED
-        d.polygon(pts + [(x1, y1), (x0, y1)],
-                  fill=fx.lerp_colour(theme.BG_BOTTOM, line, 0.18))
-        d.line(pts, fill=line, width=2, joint="curve")
+        raster.fill_under(img, pts, y1, line, (0.34, 0.06))
+        raster.polyline(img, pts, line, width=2)
 
         for frac in (0.0, 0.5, 1.0):
             gy = y1 - (y1 - y0) * frac
-            _right(d, (x1, gy - 13), f"${lo + span * frac:,.0f}",
+            _right(d, (x1, gy - 13), _money(lo + span * frac),
                    theme.font("regular", 10), theme.GREY)
 
         # Mark the 7-day high and low
-        for price, sym in ((max(prices), "H"), (min(prices), "L")):
-            i = prices.index(price)
+        low, high = geometry.extremes(prices)
+        for i, sym in ((high, "H"), (low, "L")):
+            price = prices[i]
             px, py = pts[i]
             d.ellipse((px - 3, py - 3, px + 3, py + 3), fill=theme.WHITE)
             ty = py - 16 if sym == "H" else py + 5
-            _centred(d, (min(max(px, 24), 296), ty), f"{sym} ${price:,.0f}",
+            _centred(d, (min(max(px, 24), 296), ty), f"{sym} {_money(price)}",
                      theme.font("regular", 10), theme.WHITE)
 
         # Day-of-week labels
@@ -358,31 +552,32 @@ class ChartScreen(Screen):
             _centred(d, (lx, y1 + 8), label, theme.font("regular", 10), theme.DIM)
 
         if data.price_usd is not None:
-            _right(d, (308, 6), f"${data.price_usd:,.0f}", theme.font("bold", 18), line)
+            _right(d, (308, 6), _money(data.price_usd), theme.font("bold", 18), line)
         if data.volume_24h:
             _centred(d, (160, 222), f"24H VOLUME  ${data.volume_24h / 1e9:.1f}B",
                      theme.font("regular", 12), theme.GREY)
         return img
 
     def render(self):
-        static = self._static if self._static else BG
+        frame = self._frame()
         progress = fx.ease_out_cubic(self.t / self.DRAW_IN_SECS)
 
-        if progress >= 1.0:
-            frame = static.copy()
-        else:
-            # Reveal the chart left to right
-            frame = BG.copy()
+        boxes = []
+        if progress < 1.0:
+            # Reveal the chart left to right: blank everything past the edge
             w = max(1, int(WIDTH * progress))
-            frame.paste(static.crop((0, 0, w, HEIGHT)), (0, 0))
+            frame.paste(BG.crop((w, 0, WIDTH, HEIGHT)), (w, 0))
+            boxes.append((w, 0, WIDTH, HEIGHT))
 
-        if self._pts and progress >= 1.0:
+        if len(self._line) and progress >= 1.0:
             d = ImageDraw.Draw(frame)
             tt = ((self.t - self.DRAW_IN_SECS) % 7.0) / 7.0
-            x, y = fx.polyline_at(self._pts, tt)
+            x, y = self._line.at(tt)
             x0, y0, x1, y1 = self.AREA
             d.line((x, y0, x, y1), fill=theme.DIM)
             d.ellipse((x - 3, y - 3, x + 3, y + 3), fill=theme.WHITE)
+            boxes.append(regions.box(x - 3, y0, x + 3, y1))
+        self._mark(boxes)
         return frame
 
 
@@ -391,6 +586,9 @@ class ConfigScreen(Screen):
 
     OPTIONS = ("Display time", "Brightness", "LED brightness", "LED",
                "Flip display", "Exit")
+    DEPENDS = ()
+    # Only changes on a button press, which forces a redraw anyway
+    FPS = IDLE_FPS = 2
 
     def __init__(self, data, config):
         super().__init__(data)
@@ -406,27 +604,74 @@ class ConfigScreen(Screen):
                 "ON" if c.flip_display else "OFF",
                 "")
 
-    def update(self, dt):
-        self.t += dt
-
-    def render(self):
-        frame = BG.copy()
-        d = ImageDraw.Draw(frame)
+    def _build_static(self):
+        img = BG.copy()
+        d = ImageDraw.Draw(img)
         d.rounded_rectangle((18, 14, 302, 206), 10, fill=(12, 16, 36),
                             outline=(40, 50, 84), width=2)
         d.text((34, 24), "SETTINGS", font=theme.font("bold", 16), fill=theme.GOLD)
-
-        vals = self.values()
-        for i, name in enumerate(self.OPTIONS):
-            y = 50 + i * 25
-            if i == self.selected:
-                d.rounded_rectangle((28, y - 4, 292, y + 20), 6, fill=(26, 34, 66))
-                d.rectangle((28, y - 4, 31, y + 20), fill=theme.GOLD)
-            colour = theme.WHITE if i == self.selected else theme.GREY
-            d.text((42, y), name, font=theme.font("regular", 15), fill=colour)
-            _right(d, (282, y), vals[i], theme.font("bold", 15),
-                   theme.GOLD if i == self.selected else theme.GREY)
-
         d.text((34, 216), "A up   B down   X +   Y -",
                font=theme.font("regular", 12), fill=theme.DIM)
-        return frame
+        return img
+
+    def _draw_row(self, img, i, value, selected):
+        d = ImageDraw.Draw(img)
+        y = 50 + i * 25
+        if selected:
+            d.rounded_rectangle((28, y - 4, 292, y + 20), 6, fill=(26, 34, 66))
+            d.rectangle((28, y - 4, 31, y + 20), fill=theme.GOLD)
+        d.text((42, y), self.OPTIONS[i], font=theme.font("regular", 15),
+               fill=theme.WHITE if selected else theme.GREY)
+        _right(d, (282, y), value, theme.font("bold", 15),
+               theme.GOLD if selected else theme.GREY)
+        return regions.box(28, y - 4, 292, y + 20, pad=0)
+
+    def layers(self):
+        # One layer per row, so a key press only redraws the rows it touched
+        out = []
+        for i, value in enumerate(self.values()):
+            selected = i == self.selected
+
+            def draw(img, i=i, value=value, selected=selected):
+                return self._draw_row(img, i, value, selected)
+            out.append((i, (value, selected), draw))
+        return out
+
+
+class PerfOverlay:
+    """Hidden frame-timing panel drawn over whatever screen is showing."""
+
+    BOX = (4, 4, 176, 124)
+    BAR_W = 80
+    LABELS = (("update", "UPD"), ("render", "RND"), ("transition", "TRN"),
+              ("show", "SHW"), ("work", "ALL"), ("bus", "BUS"))
+
+    def draw(self, frame, profiler, display=None, screen=None):
+        """Draw FPS, p95 phase bars and counters; returns the box covered."""
+        stats = profiler.stats()
+        budget = profiler.budget * 1000
+        fnt = theme.font("mono", 10)
+        d = ImageDraw.Draw(frame)
+        x0, y0, x1, y1 = self.BOX
+        d.rectangle(self.BOX, fill=(0, 0, 0), outline=theme.DIM)
+        d.text((x0 + 6, y0 + 4), f"FPS {stats['fps']:4.1f}  LATE {stats['late']}",
+               font=fnt, fill=theme.WHITE)
+        for i, (phase, label) in enumerate(self.LABELS):
+            y = y0 + 18 + i * 12
+            p95 = stats[phase][95]
+            frac = min(1.0, p95 / budget)
+            colour = theme.GREEN if frac < 0.5 else theme.GOLD if frac < 1 else theme.RED
+            d.text((x0 + 6, y), label, font=fnt, fill=theme.GREY)
+            d.rectangle((x0 + 30, y + 2, x0 + 30 + self.BAR_W, y + 9), fill=(24, 28, 48))
+            if frac > 0:
+                d.rectangle((x0 + 30, y + 2, x0 + 30 + self.BAR_W * frac, y + 9), fill=colour)
+            _right(d, (x1 - 6, y), f"{p95:.1f}", fnt, theme.WHITE)
+        y = y0 + 18 + len(self.LABELS) * 12
+        if display is not None and hasattr(display, "dropped"):
+            d.text((x0 + 6, y), f"SENT {display.delivered} DROP {display.dropped} "
+                   f"SKIP {display.skipped}", font=fnt, fill=theme.GREY)
+        name = type(screen).__name__ if screen is not None else None
+        if name in stats["rebuild"]:
+            d.text((x0 + 6, y + 12), f"BUILD {stats['rebuild'][name]:.1f}ms",
+                   font=fnt, fill=theme.GREY)
+        return x0, y0, x1 + 1, y1 + 1
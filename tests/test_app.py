@@ -0,0 +1,67 @@
+"""Main-loop helpers that do not need a running display."""
+
+from feargreeddisplay import CHORD, ButtonReader
+from hardware import Buttons, MockDisplay
+
+
+class Pad(MockDisplay):
+    def __init__(self):
+        super().__init__()
+        self.down = set()
+
+    def pressed(self, name):
+        return name in self.down
+
+
+def test_single_presses_fire_once():
+    pad = Pad()
+    reader = ButtonReader(pad)
+    pad.down = {Buttons.A}
+    assert reader.poll(0.0) == [Buttons.A]
+    assert reader.poll(0.1) == []
+    # Chord buttons wait for release (or a long hold) before firing
+    pad.down = {Buttons.Y}
+    assert reader.poll(1.0) == []
+    pad.down = set()
+    assert reader.poll(1.05) == [Buttons.Y]
+    pad.down = {Buttons.X}
+    reader.poll(2.0)
+    assert reader.poll(2.5) == [Buttons.X]
+
+
+def test_chord_suppresses_single_actions():
+    pad = Pad()
+    reader = ButtonReader(pad)
+    pad.down = {Buttons.X}
+    assert reader.poll(0.0) == []
+    pad.down = {Buttons.X, Buttons.Y}
+    assert reader.poll(0.05) == [CHORD]
+    pad.down = {Buttons.Y}
+    assert reader.poll(0.3) == []
+    pad.down = set()
+    assert reader.poll(0.4) == []
+
+
+def test_slide_transition_composes_into_a_reused_buffer():
+    import numpy as np
+
+    from feargreeddisplay import SlideTransition
+    from theme import HEIGHT, WIDTH
+
+    old = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    new = np.full((HEIGHT, WIDTH, 3), 200, np.uint8)
+    slide = SlideTransition(freeze=True, secs=1.0)
+    slide.start(old, new)
+    frames, ids = [], set()
+    while not slide.advance(0.25):
+        frame = slide.compose()
+        ids.add(id(frame))
+        frames.append(frame.copy())
+    assert not slide.active and len(frames) == 3
+    # Old content leaves to the left while new content enters on the right
+    for f in frames:
+        assert f.shape == (HEIGHT, WIDTH, 3)
+        assert f[0, 0, 0] == 0 and f[0, -1, 0] == 200
+    assert (frames[2] == 200).sum() > (frames[0] == 200).sum()
+    # Every step draws into the same preallocated frame
+    assert len(ids) == 1
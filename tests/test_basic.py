@@ -1,5 +1,7 @@
 """Tests for theme and fx helpers. Run anywhere, no HAT required."""
 
+import time
+
 import fx
 import theme
 
@@ -44,18 +46,34 @@ def test_easing_bounds():
 
 def test_downsample():
     pts = list(range(1000))
-    out = fx.downsample(pts, 64)
-    assert len(out) == 64
+    xs, out = fx.downsample(pts, 64)
+    # A rising series keeps each column's first (lowest) and last (highest)
+    assert len(out) == 128 and len(xs) == 128
     assert out[0] == 0 and out[-1] == 999
+    assert xs[0] == 0 and xs[-1] == 1 and (xs == out / 999).all()
     short = [1, 2, 3]
-    assert fx.downsample(short, 64) == short
+    assert fx.downsample(short, 64)[1].tolist() == short
+    from array import array
+    assert fx.downsample(array("d", pts), 64)[1].tolist() == out.tolist()
+
 
+def test_downsample_keeps_spikes_between_samples():
+    import numpy as np
 
-def test_polyline_at():
-    pts = [(0, 0), (10, 10), (20, 0)]
-    assert fx.polyline_at(pts, 0) == (0, 0)
-    assert fx.polyline_at(pts, 1) == (20, 0)
-    assert fx.polyline_at(pts, 0.5) == (10, 10)
+    rng = np.random.default_rng(1)
+    series = 100 + rng.standard_normal(100_000).cumsum()
+    series[31_337], series[77_001] = 1e4, -1e4
+    start = time.perf_counter()
+    xs, out = fx.downsample(series, 300)
+    assert time.perf_counter() - start < 0.25
+    assert out.max() == 1e4 and out.min() == -1e4
+    assert len(out) <= 4 * 300
+    # Every column's extremes survive, at their true positions
+    cols = np.arange(len(series)) * 300 // len(series)
+    for c in (0, 104, 299):
+        col = series[cols == c]
+        kept = out[np.rint(xs * (len(series) - 1)).astype(int) * 300 // len(series) == c]
+        assert kept.min() == col.min() and kept.max() == col.max()
 
 
 def test_vertical_gradient():
@@ -63,3 +81,64 @@ def test_vertical_gradient():
     assert img.size == (10, 50)
     assert img.getpixel((5, 0)) == (0, 0, 0)
     assert img.getpixel((5, 49)) == (100, 100, 100)
+
+
+def test_regions_merge():
+    import regions
+
+    assert regions.merge([]) == []
+    out = regions.merge([(3, 3, 10, 10), (5, 5, 12, 12)])
+    assert out == [(0, 0, regions.TILE, regions.TILE)]
+    # Two far-apart boxes stay separate windows
+    assert len(regions.merge([(0, 0, 4, 4), (300, 200, 304, 204)])) == 2
+    # Almost the whole frame: push it all
+    assert regions.merge([(0, 0, theme.WIDTH, theme.HEIGHT)]) is None
+
+
+def test_gradient_arc_matches_gauge_colours():
+    r, w = 116, 18
+    arc = fx.gradient_arc(r, w, tuple(theme.GAUGE_STOPS))
+    c = r + 1
+    assert arc.mode == "RGBA" and arc.size == (2 * c + 1, c + 1)
+    assert fx.gradient_arc(r, w, tuple(theme.GAUGE_STOPS)) is arc
+    mid = arc.getpixel((c, c - r + w // 2))
+    assert mid[3] == 255
+    assert all(abs(a - b) <= 2 for a, b in zip(mid[:3], theme.gauge_colour(50)))
+    left = arc.getpixel((c - r + w // 2, c))
+    assert all(abs(a - b) <= 2 for a, b in zip(left[:3], theme.gauge_colour(0)))
+    assert arc.getpixel((c, c))[3] == 0
+    assert arc.getpixel((0, 0))[3] == 0
+
+
+def test_draw_text_matches_draw_text_placement():
+    from PIL import Image, ImageDraw
+
+    fnt = theme.font("bold", 44)
+    assert fx.text_mask("$63,595", fnt) is fx.text_mask("$63,595", fnt)
+    ref = Image.new("RGB", (320, 100))
+    box = ImageDraw.Draw(ref).textbbox((0, 0), "$63,595", font=fnt)
+    ImageDraw.Draw(ref).text((160 - (box[2] - box[0]) / 2 - box[0], 20), "$63,595",
+                             font=fnt, fill=(255, 255, 255))
+    ink = ref.getbbox()
+    for atlas in (False, True):
+        img = Image.new("RGB", (320, 100))
+        covered = fx.draw_text(img, (160, 20), "$63,595", fnt, (255, 255, 255),
+                               align="centre", atlas=atlas)
+        got = img.getbbox()
+        assert all(abs(a - b) <= 2 for a, b in zip(got, ink)), (atlas, got, ink)
+        assert covered[0] <= got[0] and covered[1] <= got[1]
+        assert covered[2] >= got[2] and covered[3] >= got[3]
+
+
+def test_particles_respawn_and_draw():
+    from PIL import Image
+
+    p = fx.Particles(300, theme.GREY, theme.BG_BOTTOM, seed=3)
+    assert len(p) == 300 and p.boxes().shape == (300, 4)
+    for _ in range(100):
+        p.update(0.1)
+    # Every ember has either risen or been respawned below the bottom
+    assert (p.y >= -4).all() and (p.y <= p.h + 4).all()
+    img = Image.new("RGB", (theme.WIDTH, theme.HEIGHT))
+    p.draw(img)
+    assert img.getbbox() is not None
@@ -0,0 +1,32 @@
+"""The benchmark runs headless and flags slowdowns against a baseline."""
+
+import bench
+
+
+def test_bench_runs_every_case():
+    result = bench.run(frames=3)
+    assert set(result["cases"]) == {"gauge", "price", "chart", "config", "boot",
+                                      "slide", "slide_live"}
+    for case in result["cases"].values():
+        assert case["frame_ms"]["p50"] > 0
+        assert case["alloc"]["images_per_frame"] >= 0
+        assert 0 < case["pushed_px"] <= bench.WIDTH * bench.HEIGHT
+    refresh = result["refresh"]
+    assert refresh["cold_ms"] >= bench.API_LATENCY * 1000 * 0.5
+    assert refresh["refresh_ms"]["p50"] > 0 and refresh["requests"] == 12
+    raster = result["raster"]
+    assert 0 < raster["aa_ms"]["p50"] < raster["supersample_ms"]["p50"]
+
+
+def test_compare_flags_regressions_over_threshold():
+    def result(p50):
+        return {"cases": {"gauge": {"frame_ms": {"best_p50": p50, "p95": 1.0},
+                                    "rebuild_ms": {"p50": 1.0}}}}
+
+    assert bench.compare(result(1.1), result(1.0), threshold=0.2) == []
+    assert bench.compare(result(1.5), result(1.0), threshold=0.2) == [
+        ("gauge", "frame_ms", "best_p50", 1.0, 1.5)]
+    # Fast screens are still guarded; only timer-resolution deltas are not
+    assert bench.compare(result(0.5), result(0.2), threshold=0.2) == [
+        ("gauge", "frame_ms", "best_p50", 0.2, 0.5)]
+    assert bench.compare(result(0.04), result(0.01), threshold=0.2) == []
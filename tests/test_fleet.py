@@ -0,0 +1,132 @@
+"""Fleet server and thin client, over localhost."""
+
+import threading
+import time
+
+import numpy as np
+
+from fleet import FleetClient, FleetServer
+from hardware import MockDisplay
+
+
+class RecordingDisplay(MockDisplay):
+    def __init__(self):
+        super().__init__()
+        self.shown = []
+        self.led = None
+
+    def show(self, image, dirty=None):
+        super().show(image, dirty)
+        self.shown.append(dirty)
+
+    def set_led(self, r, g, b):
+        self.led = (r, g, b)
+
+
+def wait_for(cond, timeout=5):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_client_mirrors_server_frames():
+    local = RecordingDisplay()
+    server = FleetServer(local=local, host="127.0.0.1", port=0)
+    remote = RecordingDisplay()
+    client = FleetClient(remote, "127.0.0.1", server.address[1])
+    thread = threading.Thread(target=client.run, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(lambda: server.peers)
+        rng = np.random.default_rng(1)
+        frame = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+        server.show(frame)
+        assert wait_for(lambda: np.array_equal(client.frame, frame))
+
+        frame = frame.copy()
+        frame[40:56, 32:64] = 7
+        server.show(frame, [(32, 40, 64, 56)])
+        assert wait_for(lambda: np.array_equal(client.frame, frame))
+        assert remote.shown[-1] == [(32, 40, 64, 56)]
+
+        server.set_led(0.5, 0.25, 0.0)
+        assert wait_for(lambda: remote.led == (0.5, 0.25, 0.0))
+        assert local.frames == 2
+    finally:
+        client.stop()
+        server.close()
+        thread.join(timeout=5)
+
+
+def test_late_client_gets_a_keyframe():
+    server = FleetServer(host="127.0.0.1", port=0)
+    frame = np.full((240, 320, 3), 99, np.uint8)
+    server.show(frame)
+    server.show(frame, [(0, 0, 16, 16)])
+    remote = RecordingDisplay()
+    client = FleetClient(remote, "127.0.0.1", server.address[1])
+    thread = threading.Thread(target=client.run, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(lambda: np.array_equal(client.frame, frame))
+        assert remote.shown[0] is None
+    finally:
+        client.stop()
+        server.close()
+        thread.join(timeout=5)
+
+
+def test_client_joining_mid_stream_ends_up_with_the_server_frame():
+    server = FleetServer(host="127.0.0.1", port=0)
+    frame = np.zeros((240, 320, 3), np.uint8)
+    server.show(frame)
+    server.set_led(0.0, 0.0, 0.0)
+    led_message = server._led_message
+
+    def frame_while_joining(*rgb):
+        # Runs as the server accepts, before the peer is registered: a
+        # frame shown now must still reach it
+        time.sleep(0.1)
+        frame[:16, :16] = 255
+        server.show(frame, [(0, 0, 16, 16)])
+        return led_message(*rgb)
+    server._led_message = frame_while_joining
+
+    client = FleetClient(RecordingDisplay(), "127.0.0.1", server.address[1])
+    thread = threading.Thread(target=client.run, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(lambda: server.peers)
+        server._led_message = led_message
+        for i in range(1, 20):
+            frame[100:116, i * 16:i * 16 + 16] = i
+            server.show(frame, [(i * 16, 100, i * 16 + 16, 116)])
+        assert wait_for(lambda: np.array_equal(client.frame, frame))
+    finally:
+        client.stop()
+        server.close()
+        thread.join(timeout=5)
+
+
+def test_client_refuses_rectangles_that_inflate_past_their_size():
+    import socket
+    import zlib
+
+    from fleet import HEADER, MAGIC, RECT, FRAME
+
+    ours, theirs = socket.socketpair()
+    bomb = zlib.compress(bytes(10 * 240 * 320 * 3))
+    theirs.sendall(HEADER.pack(MAGIC, FRAME, 1, 1) + RECT.pack(0, 0, 16, 16, len(bomb)) + bomb)
+    client = FleetClient(RecordingDisplay(), "127.0.0.1")
+    try:
+        client.receive(ours)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("oversized rectangle accepted")
+    finally:
+        ours.close()
+        theirs.close()
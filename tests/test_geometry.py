@@ -0,0 +1,48 @@
+"""Series mapping and arc-length sampling for the charts."""
+
+import time
+
+import numpy as np
+
+import geometry
+from geometry import Polyline
+
+
+def test_map_series_spans_the_box():
+    pts = geometry.map_series([5, 10, 0], (10, 20, 110, 220))
+    assert pts.tolist() == [[10, 120], [60, 20], [110, 220]]
+    pts = geometry.map_series([5, 10, 0], (10, 20, 110, 220), xs=[0, 0.1, 1])
+    assert pts[:, 0].tolist() == [10, 20, 110]
+
+
+def test_extremes():
+    assert geometry.extremes([3, 1, 4, 1, 5, 9, 2]) == (1, 5)
+
+
+def test_polyline_at():
+    line = Polyline([(0, 0), (10, 10), (20, 0)])
+    assert line.at(0) == (0, 0)
+    assert line.at(1) == (20, 0)
+    assert line.at(0.5) == (10, 10)
+    assert Polyline(()).at(0.5) == (0, 0) and len(Polyline(())) == 0
+    assert Polyline([(4, 4)]).at(0.5) == (4, 4)
+
+
+def test_polyline_moves_at_constant_speed():
+    # A long first segment and many short ones: by index the dot would
+    # spend a sliver of its time crossing the long one
+    line = Polyline([(0, 0), (90, 0)] + [(90 + i, 0) for i in range(1, 11)])
+    assert line.length == 100
+    for t in (0.1, 0.45, 0.9, 0.95):
+        x, y = line.at(t)
+        assert abs(x - 100 * t) < 1e-9 and y == 0
+
+
+def test_polyline_lookup_is_cheap_on_long_series():
+    pts = geometry.map_series(np.random.default_rng(2).standard_normal(50_000).cumsum(),
+                              (0, 0, 300, 200))
+    line = Polyline(pts)
+    start = time.perf_counter()
+    for i in range(1000):
+        line.at(i / 1000)
+    assert (time.perf_counter() - start) / 1000 < 1e-3
@@ -0,0 +1,193 @@
+"""Display wrappers, exercised against the mock display."""
+
+import threading
+import time
+
+from hardware import DisplayWriter, MockDisplay, RGB565Packer
+
+
+class SlowDisplay(MockDisplay):
+    """Mock whose push takes a while, like a full SPI transfer."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.shown = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def show(self, image, dirty=None):
+        self.gate.wait()
+        time.sleep(self.delay)
+        super().show(image, dirty)
+        self.shown.append((image, dirty))
+
+
+def test_writer_delivers_latest_and_counts_drops():
+    disp = SlowDisplay(0.005)
+    writer = DisplayWriter(disp)
+    for i in range(50):
+        writer.show(i, [(0, 0, 16, 16)])
+    assert writer.flush(timeout=5)
+    assert writer.delivered + writer.dropped == 50
+    assert writer.dropped > 0
+    assert disp.shown[-1][0] == 49
+    writer.close()
+
+
+def test_writer_folds_dirty_boxes_of_dropped_frames():
+    disp = SlowDisplay(0)
+    disp.gate.clear()
+    writer = DisplayWriter(disp)
+    writer.show("busy", None)
+    while not writer._busy:
+        time.sleep(0.001)
+    writer.show("a", [(0, 0, 16, 16)])
+    writer.show("b", [(64, 64, 80, 80)])
+    disp.gate.set()
+    assert writer.flush(timeout=5)
+    image, dirty = disp.shown[-1]
+    assert image == "b"
+    assert (0, 0, 16, 16) in dirty and (64, 64, 80, 80) in dirty
+    assert writer.dropped == 1
+    writer.close()
+
+
+def test_writer_owns_the_frames_it_sends():
+    import numpy as np
+
+    from hardware import frame_digest
+
+    disp = SlowDisplay(0.01)
+    torn = []
+    push = disp.show
+
+    def show(image, dirty=None):
+        digest = frame_digest(image)
+        push(image, dirty)
+        torn.append(frame_digest(image) != digest)
+    disp.show = show
+    writer = DisplayWriter(disp)
+    # The caller keeps drawing into one buffer while the bus is busy
+    frame = np.zeros((240, 320, 3), np.uint8)
+    for i in range(20):
+        frame[:] = i
+        writer.show(frame)
+        time.sleep(0.002)
+    assert writer.flush(timeout=5)
+    assert torn and not any(torn)
+    assert disp.shown[-1][0][0, 0, 0] == 19
+    writer.close()
+
+
+def test_writer_pushes_full_frame_after_flip():
+    disp = SlowDisplay(0)
+    writer = DisplayWriter(disp)
+    writer.set_flip(True)
+    writer.show("frame", [(0, 0, 16, 16)])
+    assert writer.flush(timeout=5)
+    assert disp.flipped
+    assert disp.shown[-1] == ("frame", None)
+    writer.close()
+
+
+def test_writer_pushes_full_frame_after_failed_push():
+    disp = SlowDisplay(0)
+    fail = [True]
+
+    def show(image, dirty=None):
+        if fail.pop():
+            raise OSError("spi")
+        disp.shown.append((image, dirty))
+    disp.show = show
+    writer = DisplayWriter(disp)
+    writer.show("lost", [(0, 0, 16, 16)])
+    assert writer.flush(timeout=5)
+    fail.append(False)
+    writer.show("next", [(64, 64, 80, 80)])
+    assert writer.flush(timeout=5)
+    assert disp.shown == [("next", None)]
+    writer.close()
+
+
+def _reference_565(arr):
+    """The st7789 driver's own conversion, for comparison."""
+    pb = arr.astype("uint16")
+    result = ((pb[..., 0] & 0xF8) << 8) | ((pb[..., 1] & 0xFC) << 3) | (pb[..., 2] >> 3)
+    return result.byteswap().tobytes()
+
+
+def test_rgb565_packer_matches_driver_conversion():
+    import numpy as np
+    from PIL import Image
+
+    from hardware import RGB565Packer
+
+    rng = np.random.default_rng(1)
+    arr = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    img = Image.fromarray(arr)
+    packer = RGB565Packer()
+    assert packer.pack(img) == _reference_565(arr)
+    assert packer.pack(arr, rotation=180) == _reference_565(np.rot90(arr, 2))
+    box = (16, 32, 80, 64)
+    window = arr[32:64, 16:80]
+    assert packer.pack(img, box) == _reference_565(window)
+    assert packer.pack(arr, box, rotation=180) == _reference_565(window[::-1, ::-1])
+
+
+class FakeST7789:
+    def __init__(self, rotation=180):
+        self._rotation = rotation
+        self.writes = []
+
+    def set_window(self, x0, y0, x1, y1):
+        self.writes.append([(x0, y0, x1, y1), b""])
+
+    def data(self, chunk):
+        self.writes[-1][1] += bytes(chunk)
+
+
+def test_pi_display_folds_flip_into_panel_rotation():
+    import numpy as np
+
+    from hardware import PiDisplay
+
+    rng = np.random.default_rng(2)
+    arr = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    disp = PiDisplay.__new__(PiDisplay)
+    disp.dhm = type("DHM", (), {"st7789": FakeST7789()})()
+    disp.flipped = False
+    disp._packer = RGB565Packer()
+
+    disp.show(arr)
+    assert disp.dhm.st7789.writes[-1] == [(0, 0, 319, 239), _reference_565(np.rot90(arr, 2))]
+    disp.show(arr, [(0, 0, 16, 16)])
+    window, data = disp.dhm.st7789.writes[-1]
+    assert window == (304, 224, 319, 239)
+    assert data == _reference_565(arr[:16, :16][::-1, ::-1])
+
+    disp.set_flip(True)
+    disp.show(arr)
+    assert disp.dhm.st7789.writes[-1] == [(0, 0, 319, 239), _reference_565(arr)]
+
+
+def test_writer_skips_identical_frames():
+    import numpy as np
+
+    disp = SlowDisplay(0)
+    writer = DisplayWriter(disp)
+    frame = np.zeros((240, 320, 3), np.uint8)
+    for i in range(4):
+        writer.show(frame.copy(), [(0, 0, 16, 16)])
+        assert writer.flush(timeout=5)
+    assert (writer.delivered, writer.skipped) == (1, 3)
+    frame[5, 5] = 255
+    writer.show(frame, [(0, 0, 16, 16)])
+    assert writer.flush(timeout=5)
+    assert writer.delivered == 2
+    # A flip changes what is on the panel, so the same frame goes out again
+    writer.set_flip(True)
+    writer.show(frame.copy())
+    assert writer.flush(timeout=5)
+    assert writer.delivered == 3 and disp.shown[-1][1] is None
+    writer.close()
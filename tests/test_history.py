@@ -0,0 +1,62 @@
+"""The tiered history store: append-only rollups and bounded queries."""
+
+import time
+
+import history
+import market_data
+from history import DAY, HOUR, WEEK, History
+from market_data import MarketData
+
+T0 = 1_700_006_400              # midnight UTC, so hour and day buckets start here
+
+
+def test_points_roll_up_into_every_tier_once():
+    h = History()
+    points = [(T0 + m * 600, 100 + m) for m in range(12)]      # two hours, 10 min apart
+    assert h.record("price:bitcoin", points) == 12
+    # Overlap is ignored: only the one newer point is added
+    assert h.record("price:bitcoin", points + [(T0 + 7200, 200)]) == 1
+    assert h.newest("price:bitcoin") == T0 + 7200
+
+    ts, mean, lo, hi = h.query("price:bitcoin", T0, T0 + 3 * HOUR, width=300)
+    assert list(ts) == [T0, T0 + HOUR, T0 + 2 * HOUR]
+    assert list(mean) == [102.5, 108.5, 200]
+    assert (lo[0], hi[0]) == (100, 105)
+    _, day_mean, day_lo, day_hi = h.query("price:bitcoin", T0, T0 + 400 * DAY, width=300)
+    assert len(day_mean) == 1 and (day_lo[0], day_hi[0]) == (100, 200)
+
+
+def test_query_rows_are_bounded_by_width():
+    h = History()
+    h.record("fng", [(T0 + i * HOUR, i % 100) for i in range(2 * 365 * 24)])
+    assert history.tier_for(30 * DAY, 320) == HOUR
+    assert history.tier_for(365 * DAY, 320) == DAY
+    assert history.tier_for(5 * 365 * DAY, 320) == WEEK
+    end = T0 + 2 * 365 * DAY
+    for span in (DAY, 30 * DAY, 365 * DAY, 2 * 365 * DAY):
+        ts, *_ = h.query("fng", end - span, end, width=100)
+        assert 0 < len(ts) <= 100 * history.OVERSAMPLE + 1
+    assert all(len(col) == 0 for col in h.query("price:ethereum", T0, end, 100))
+
+
+def test_history_persists_and_market_data_records_into_it(tmp_path):
+    from fakeapi import StandInAPI
+
+    path = str(tmp_path / "history.db")
+    api = StandInAPI(seed=1).start()
+    try:
+        data = MarketData(endpoints=market_data.endpoints_for(api.url),
+                          history=History(path))
+        assert data.refresh()
+        assert data.refresh()
+    finally:
+        api.stop()
+    data.history.close()
+
+    reopened = History(path)
+    newest = reopened.newest("fng")
+    _, fng, _, _ = reopened.query("fng", newest - 60 * DAY, newest, width=320)
+    assert len(fng) == 30
+    now = time.time()
+    ts, prices, _, _ = reopened.query("price:bitcoin", now - 7 * DAY - HOUR, now, width=320)
+    assert len(prices) >= 168 and ts[-1] > now - 2 * HOUR
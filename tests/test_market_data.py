@@ -0,0 +1,312 @@
+"""MarketData parsing and refresh behaviour, with the network faked out."""
+
+import json
+import time
+
+import market_data
+from market_data import MarketData
+
+NOW_MS = int(time.time() * 1000)
+HOUR_MS = 3_600_000
+CHART = [[NOW_MS - (167 - i) * HOUR_MS, 60000 + i * 10] for i in range(168)]
+BTC_CHART = market_data.CG_CHART.format(id="bitcoin")
+BTC_CHART_RANGE = market_data.CG_CHART_RANGE.format(id="bitcoin")
+
+PAYLOADS = {
+    market_data.FNG_URL: {"data": [{"value": str(40 - i), "value_classification": "Fear"}
+                                   for i in range(30)]},
+    market_data.CG_MARKETS: [{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin",
+                              "current_price": 63595, "price_change_percentage_24h": 1.5,
+                              "high_24h": 64285, "low_24h": 62320,
+                              "total_volume": 31e9}],
+    BTC_CHART: {"prices": CHART},
+    market_data.CG_SIMPLE: {"bitcoin": {"gbp": 50240}},
+}
+
+
+class FakeResponse:
+    def __init__(self, payload, status=200, headers=None):
+        self.payload = payload
+        self.status_code = status
+        self.headers = headers or {}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise market_data.requests.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self.payload
+
+    def iter_content(self, chunk_size=1):
+        body = json.dumps(self.payload).encode()
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self.responses = []
+        self.chart = CHART
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls.append(url)
+        time.sleep(self.delay)
+        if url in self.fail:
+            self.responses.append(FakeResponse(None, 500))
+            return self.responses[-1]
+        if url == BTC_CHART_RANGE:
+            tail = [p for p in self.chart if p[0] >= params["from"] * 1000]
+            return FakeResponse({"prices": tail})
+        return FakeResponse(PAYLOADS[url])
+
+
+def make_data(**kwargs):
+    data = MarketData()
+    data._session = FakeSession(**kwargs)
+    return data
+
+
+def test_refresh_parses_every_source():
+    data = make_data()
+    assert data.refresh()
+    assert data.fng_value == 40 and data.fng_history[-1] == 40
+    assert data.price_usd == 63595 and data.price_gbp == 50240
+    assert len(data.chart_7d) == 168
+    assert data.error is None
+    assert all(data.versions.values())
+
+
+def test_refresh_fetches_in_parallel_and_records_timings():
+    data = make_data(delay=0.2)
+    start = time.monotonic()
+    assert data.refresh()
+    assert time.monotonic() - start < 0.6
+    assert set(data.timings) == {"fng", "markets", "chart:bitcoin", "gbp", "total"}
+    assert all(t >= 0.2 for name, t in data.timings.items() if name != "total")
+
+
+def test_gbp_failure_is_not_fatal():
+    data = make_data(fail=(market_data.CG_SIMPLE,))
+    assert data.refresh()
+    assert data.price_gbp is None
+    data = make_data(fail=(BTC_CHART,))
+    assert not data.refresh()
+    assert data.error.startswith("Chart")
+    # The failed streamed response gave its connection back
+    assert all(r.closed for r in data._session.responses)
+
+
+def test_changes_are_versioned_when_another_source_fails():
+    data = make_data(fail=(BTC_CHART,))
+    assert not data.refresh()
+    assert data.fng_value == 40
+    assert data.versions["fng"] and data.versions["markets"] and data.versions["gbp"]
+    assert data.versions["chart"] == 0
+    # The next round finds F&G and prices unchanged but they were already counted
+    data._session.fail = ()
+    fng = data.versions["fng"]
+    assert data.refresh()
+    assert data.versions["fng"] == fng and data.versions["chart"]
+
+
+def test_a_failing_source_stays_stale_while_others_refresh():
+    data = make_data()
+    assert data.refresh()
+    data._succeeded["fng"] -= 20 * 60           # F&G last answered 20 minutes ago
+    data._session.fail = (market_data.FNG_URL,)
+    assert not data.refresh(["fng"])
+    # Fresh prices neither clear the F&G error nor hide its age
+    assert data.refresh(["markets"])
+    assert data.error.startswith("F&G") and data.stale_minutes() >= 20
+    data._session.fail = (BTC_CHART_RANGE,)
+    data.refresh(["fng", "chart:bitcoin"])
+    assert data.error.startswith("Chart") and data.stale_minutes() < 1
+
+
+def test_refresh_after_stop_does_nothing():
+    data = make_data()
+    data.stop()
+    assert not data.refresh()
+    assert data._session.calls == []
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    data = make_data()
+    data.cache_path = path
+    assert data.refresh()
+    assert not (tmp_path / "snapshot.json.tmp").exists()
+
+    restored = MarketData(cache_path=path)
+    assert restored.cached
+    assert restored.fng_value == 40 and restored.price_usd == 63595
+    assert restored.chart_7d == data.chart_7d
+    assert restored.versions == data.versions
+    assert restored.stale_minutes() < 1
+
+
+def test_single_coin_snapshot_still_loads(tmp_path):
+    path = tmp_path / "snapshot.json"
+    old = {"fng_value": 40, "fng_label": "Fear", "fng_history": [40], "price_usd": 63595,
+           "chart_7d": [1.0, 2.0], "chart_ts": [0, 1], "last_update": time.time(),
+           "versions": {"fng": 2, "markets": 3, "chart": 1}}
+    path.write_text(json.dumps(old))
+    data = MarketData(cache_path=str(path))
+    assert data.cached and data.price_usd == 63595 and list(data.chart_7d) == [1.0, 2.0]
+    assert data.versions["markets"] == 3 and data.versions["gbp"] == 0
+
+
+def test_missing_or_corrupt_snapshot_is_ignored(tmp_path):
+    assert not MarketData(cache_path=str(tmp_path / "absent.json")).cached
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json")
+    data = MarketData(cache_path=str(bad))
+    assert not data.cached and data.fng_value is None
+
+
+def test_merge_chart_keeps_hourly_spacing_and_evicts():
+    now = NOW_MS / 1000
+    ts, prices = market_data.merge_chart([], [], CHART, now)
+    assert list(prices) == [p for _, p in CHART]
+    # Five-minute tail: the provisional newest point keeps being replaced
+    tail = [[CHART[-1][0] + m * 300_000, 70000 + m] for m in range(1, 12)]
+    ts2, prices2 = market_data.merge_chart(ts, prices, tail, now + 3300)
+    assert prices2[-1] == 70011
+    assert len(ts2) == len(ts) + 1
+    assert all(b - a >= HOUR_MS for a, b in zip(ts2[:-2], ts2[1:-1]))
+    # A day later the oldest points fall out of the 7-day window
+    ts3, _ = market_data.merge_chart(ts2, prices2, [], now + 86400)
+    assert ts3[0] >= NOW_MS - 6 * 86400_000
+    assert list(ts) == [t for t, _ in CHART]
+
+
+def test_chart_refresh_is_incremental_and_version_stable():
+    data = make_data()
+    assert data.refresh()
+    version = data.version
+    data._session.calls.clear()
+    assert data.refresh()
+    assert BTC_CHART_RANGE in data._session.calls
+    assert BTC_CHART not in data._session.calls
+    assert data.version == version
+    data._session.chart = CHART + [[NOW_MS + HOUR_MS, 99000]]
+    before = dict(data.versions)
+    assert data.refresh()
+    assert data.chart_7d[-1] == 99000
+    assert [g for g in before if data.versions[g] != before[g]] == ["chart"]
+
+
+def test_refresh_against_the_stand_in_api():
+    from fakeapi import StandInAPI
+
+    api = StandInAPI(latency=0.05, seed=1).start()
+    try:
+        data = MarketData(endpoints=market_data.endpoints_for(api.url))
+        assert data.refresh()
+        assert data.fng_value is not None and data.price_gbp is not None
+        assert len(data.chart_7d) >= 168
+        assert data.chart_ts[-1] / 1000 > time.time() - 60
+        assert data.refresh()
+        # Unchanged sources revalidate with a 304; the chart tail is new
+        assert api.hits["range"] == 1
+        assert api.statuses[200] == 5 and api.statuses[304] == 3
+        assert data.not_modified == 3
+
+        api.errors = 1.0
+        assert not data.refresh()
+        assert api.statuses[500] == 4
+    finally:
+        api.stop()
+
+
+def test_extra_coins_cost_one_chart_request_each():
+    from fakeapi import StandInAPI
+
+    api = StandInAPI(seed=1).start()
+    try:
+        data = MarketData(endpoints=market_data.endpoints_for(api.url),
+                          coins=("bitcoin", "ethereum", "solana"))
+        assert data.refresh()
+        assert sum(api.hits.values()) == 3 + 3
+        assert api.hits["markets"] == 1 and api.hits["market_chart"] == 3
+        eth = data.asset("ethereum")
+        assert eth.symbol == "ETH" and eth.price_gbp and len(eth.chart_7d) >= 168
+        assert data.price_usd == data.asset("bitcoin").price_usd != eth.price_usd
+        # A change to one coin leaves the others' versions alone
+        btc, sol = dict(data.versions), dict(data.asset("solana").versions)
+        eth.chart_7d = eth.chart_7d[:-1]
+        eth.touch("chart")
+        assert data.versions == btc and data.asset("solana").versions == sol
+        assert eth.versions["chart"] == btc["chart"] + 1
+    finally:
+        api.stop()
+
+
+def test_stand_in_rate_limit_answers_429_with_retry_after():
+    from fakeapi import StandInAPI
+
+    api = StandInAPI(rate_limit=2)
+    statuses = [api.respond("/api/v3/simple/price")[:2] for _ in range(3)]
+    assert [s for s, _ in statuses] == [200, 200, 429]
+    assert 1 <= int(statuses[2][1]["Retry-After"]) <= 60
+    api.server.server_close()
+
+
+def test_sources_back_off_and_share_a_rate_limit():
+    from fakeapi import StandInAPI
+
+    api = StandInAPI(rate_limit=1).start()
+    try:
+        data = MarketData(endpoints=market_data.endpoints_for(api.url))
+        # One request gets through, the rest are told to wait
+        sources = ("markets", "gbp", "chart:bitcoin")
+        assert not data.refresh(sources)
+        now = time.monotonic()
+        waits = {n: data.schedules[n].next_due - now for n in sources}
+        assert all(w >= 1 for w in waits.values())
+        assert max(waits.values()) <= 400
+        assert data.error
+    finally:
+        api.stop()
+
+
+def test_schedule_backoff_is_exponential_jittered_and_floored():
+    sched = market_data.Schedule(60)
+    waits = []
+    for _ in range(8):
+        sched.failed(0.0)
+        waits.append(sched.next_due)
+    assert waits[0] <= market_data.RETRY_SECS * 1.1
+    assert waits[2] >= market_data.RETRY_SECS * 4 * 0.9
+    assert max(waits) <= market_data.MAX_BACKOFF * 1.1
+    sched.failed(0.0, wait=5000)
+    assert sched.next_due == 5000
+    sched.succeeded(100.0)
+    assert sched.failures == 0 and 100 + 54 <= sched.next_due <= 100 + 66
+    assert market_data.retry_after("120") == 120
+    assert market_data.retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412420) == 60
+    assert market_data.retry_after("soon") is None
+
+
+def test_parse_prices_streams_only_the_prices_array():
+    body = json.dumps({"prices": CHART[:3] + [[NOW_MS, None]],
+                       "market_caps": [[1, 2]], "total_volumes": "not parsed ["}).encode()
+    for size in (1, 7, len(body)):
+        chunks = (body[i:i + size] for i in range(0, len(body), size))
+        ts, prices = market_data.parse_prices(chunks)
+        assert list(ts) == [t for t, _ in CHART[:3]]
+        assert list(prices) == [p for _, p in CHART[:3]]
+        assert prices.typecode == "d"
+    try:
+        market_data.parse_prices([b'{"prices": [[1, 2], [3'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("truncated body accepted")
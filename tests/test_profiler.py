@@ -0,0 +1,63 @@
+"""Frame profiler and the performance overlay."""
+
+import time
+
+from PIL import ImageChops
+
+from profiler import FrameProfiler, Ring
+from screens import BG, PerfOverlay
+
+
+def test_ring_keeps_latest_values():
+    r = Ring(4)
+    for v in range(10):
+        r.add(v)
+    assert sorted(r.values()) == [6, 7, 8, 9]
+    assert r.percentile(50) == 7.5
+
+
+def test_profiler_phases_and_late_frames():
+    prof = FrameProfiler(budget=0.005)
+    for i in range(5):
+        prof.begin()
+        time.sleep(0.01 if i == 0 else 0)
+        prof.mark("render")
+        time.sleep(0.002)
+        prof.mark("sleep")
+        prof.end()
+    stats = prof.stats()
+    assert stats["frames"] == 5
+    assert stats["late"] == 1
+    assert stats["render"][99] >= 9
+    assert stats["sleep"][50] >= 1.5
+    assert stats["fps"] > 0
+    prof.rebuild("GaugeScreen", 0.004)
+    assert abs(prof.stats()["rebuild"]["GaugeScreen"] - 4) < 1e-6
+
+
+def test_writer_times_the_bus_into_the_profiler():
+    from hardware import DisplayWriter, MockDisplay
+
+    class SlowDisplay(MockDisplay):
+        def show(self, image, dirty=None):
+            time.sleep(0.01)
+
+    prof = FrameProfiler()
+    writer = DisplayWriter(SlowDisplay())
+    writer.profiler = prof
+    writer.show("frame")
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert prof.stats()["bus"][50] >= 9
+
+
+def test_overlay_draws_inside_its_box():
+    prof = FrameProfiler()
+    prof.begin()
+    prof.mark("render")
+    prof.end()
+    frame = BG.copy()
+    box = PerfOverlay().draw(frame, prof)
+    assert ImageChops.difference(frame, BG).getbbox() is not None
+    frame.paste(BG.crop(box), box[:2])
+    assert ImageChops.difference(frame, BG).getbbox() is None
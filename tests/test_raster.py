@@ -0,0 +1,45 @@
+"""Anti-aliased chart lines and fills: coverage and the boxes drawn."""
+
+import numpy as np
+from PIL import Image
+
+import raster
+
+WHITE = (255, 255, 255)
+
+
+def blank(w=20, h=20):
+    return Image.new("RGB", (w, h))
+
+
+def test_line_coverage_is_exact_vertically():
+    img = blank()
+    box = raster.polyline(img, [(2, 10.5), (18, 10.5)], WHITE, width=2)
+    # Centred on a row: one full row and half of each neighbour
+    assert np.asarray(img)[8:14, 10, 0].tolist() == [0, 128, 255, 128, 0, 0]
+    assert box == (1, 9, 19, 12)
+    img = blank()
+    raster.polyline(img, [(2, 10), (18, 10)], WHITE, width=2)
+    assert np.asarray(img)[8:13, 10, 0].tolist() == [0, 255, 255, 0, 0]
+
+
+def test_line_keeps_spikes_and_blends_smoothly():
+    img = blank(40, 40)
+    raster.polyline(img, [(2, 30), (20, 30), (20.2, 3), (20.4, 30), (38, 20)], WHITE)
+    px = np.asarray(img)[:, :, 0]
+    assert px[4, 19:22].max() > 200              # the spike survives
+    # The sloped run has partially covered edge pixels, not a staircase
+    edge = px[:, 30]
+    assert ((edge > 0) & (edge < 255)).any()
+    assert raster.polyline(blank(), [(5, 5)], WHITE) is None
+
+
+def test_fill_fades_towards_the_base():
+    img = blank()
+    box = raster.fill_under(img, [(0, 4.25), (20, 4.25)], 16, WHITE, (1.0, 0.0))
+    col = np.asarray(img)[:, 10, 0].astype(int)
+    assert box == (0, 4, 20, 16)
+    assert col[3] == 0 and col[16] == 0
+    assert 0 < col[4] < col[5]                   # anti-aliased top edge
+    assert all(a >= b for a, b in zip(col[5:16], col[6:16]))
+
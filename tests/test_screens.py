@@ -22,7 +22,7 @@ def full_data():
     d.volume_24h = 31e9
     d.chart_7d = [60000 + (i % 30) * 100 for i in range(168)]
     d.last_update = time.time()
-    d.version = 1
+    d.touch_all()
     return d
 
 
@@ -33,6 +33,11 @@ class FakeConfig:
 
 def run_screen(screen, seconds=2.0, fps=20):
     screen.on_enter()
+    return run_screen_on(screen, seconds, fps)
+
+
+def run_screen_on(screen, seconds, fps=20):
+    """Like run_screen, without re-entering the screen."""
     frame = None
     for _ in range(int(seconds * fps)):
         screen.update(1 / fps)
@@ -65,7 +70,7 @@ def test_render_with_partial_data():
     d = MarketData()
     d.fng_value = 80
     d.price_usd = 100000
-    d.version = 1
+    d.touch_all()
     for screen in all_screens(d):
         check(run_screen(screen, seconds=1.0))
 
@@ -76,6 +81,99 @@ def test_static_layer_rebuilds_on_new_data():
     run_screen(screen, seconds=0.2)
     first = screen._static
     d.fng_value = 90
-    d.version += 1
+    d.touch("fng")
     run_screen(screen, seconds=0.2)
     assert screen._static is not first
+
+
+def test_dirty_regions_cover_every_changed_pixel():
+    from PIL import ImageChops
+
+    for screen in all_screens(full_data())[:3]:
+        screen.on_enter()
+        prev = None
+        for _ in range(60):
+            screen.update(1 / 20)
+            frame = screen.render()
+            if prev is not None and screen.dirty is not None:
+                diff = ImageChops.difference(prev, frame)
+                for box in screen.dirty:
+                    diff.paste((0, 0, 0), box)
+                assert diff.getbbox() is None, type(screen).__name__
+            prev = frame
+
+
+def test_static_layer_only_rebuilds_for_its_own_fields():
+    d = full_data()
+    gauge, price = GaugeScreen(d), PriceScreen(d)
+    run_screen(gauge, seconds=0.2)
+    run_screen(price, seconds=0.2)
+    gauge_static, price_static = gauge._static, price._static
+    d.price_gbp = 51000
+    d.touch("gbp")
+    run_screen(gauge, seconds=0.2)
+    run_screen(price, seconds=0.2)
+    assert gauge._static is gauge_static
+    assert price._static is not price_static
+
+
+def test_each_coin_has_its_own_screens_and_static_layers():
+    d = MarketData(coins=("bitcoin", "solana"))
+    for coin, price in (("bitcoin", 63595), ("solana", 146.83)):
+        a = d.asset(coin)
+        a.price_usd, a.change_24h = price, 1.0
+        a.chart_7d = [price * (1 + (i % 30) / 100) for i in range(168)]
+    d.touch_all()
+    btc, sol = PriceScreen(d), PriceScreen(d, "solana")
+    for screen in (btc, sol, ChartScreen(d, "solana")):
+        check(run_screen(screen, seconds=1.5))
+    assert sol.data.price_usd == 146.83 and btc.data is d.asset("bitcoin")
+    assert btc._base.tobytes() != sol._base.tobytes()
+    btc_static, sol_static = btc._static, sol._static
+    d.asset("solana").price_usd = 150.0
+    d.asset("solana").touch("markets")
+    run_screen_on(btc, 0.2)
+    run_screen_on(sol, 0.2)
+    assert btc._static is btc_static and sol._static is not sol_static
+
+
+def test_screens_drop_to_idle_rate_once_settled():
+    d = full_data()
+    gauge, price, chart, config = all_screens(d)
+    for screen in (gauge, price, chart):
+        screen.on_enter()
+        screen.update(0)
+        assert screen.fps() == screen.FPS
+    run_screen(price, seconds=2.0)
+    run_screen(chart, seconds=2.0)
+    assert price.fps() == price.IDLE_FPS < price.FPS
+    assert chart.fps() == chart.IDLE_FPS < chart.FPS
+    # Needle settled and pulse ring quiet
+    run_screen(gauge, seconds=3.0)
+    assert gauge.fps() == gauge.IDLE_FPS < gauge.FPS
+    assert config.fps() <= 2
+
+
+def test_layers_redraw_only_what_changed():
+    from PIL import ImageChops
+
+    import regions
+
+    d = full_data()
+    config = ConfigScreen(d, FakeConfig())
+    run_screen(config, seconds=0.2)
+    config.selected = 2
+    config.update(0.05)
+    frame = config.render()
+    fresh = ConfigScreen(d, FakeConfig())
+    fresh.selected = 2
+    assert ImageChops.difference(frame, run_screen(fresh, seconds=0.2)).getbbox() is None
+    assert 0 < regions.area(config.dirty) < WIDTH * HEIGHT // 2
+
+    # Badge changes on a settled price screen, across every ring buffer
+    price = PriceScreen(d)
+    run_screen(price, seconds=2.0)
+    d.last_update = time.time() - 20 * 60
+    frame = run_screen_on(price, seconds=0.3)
+    fresh = PriceScreen(d)
+    assert ImageChops.difference(frame, run_screen(fresh, seconds=2.3)).getbbox() is None
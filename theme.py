@@ -34,6 +34,21 @@ GAUGE_STOPS = [
     (100, (0, 235, 130)),
 ]
 
+# Per-coin styling by CoinGecko id: (symbol, name, badge colour, badge ink)
+ASSETS = {
+    "bitcoin": ("BTC", "BITCOIN", GOLD, (40, 26, 4)),
+    "ethereum": ("ETH", "ETHEREUM", (140, 150, 245), (24, 26, 62)),
+    "solana": ("SOL", "SOLANA", (170, 100, 245), (34, 14, 58)),
+}
+
+
+def asset_style(coin, symbol=None, name=None):
+    """(symbol, name, colour, ink) for a coin. Coins without an entry in
+    ASSETS get a grey badge labelled with the API's symbol and name."""
+    if coin in ASSETS:
+        return ASSETS[coin]
+    return ((symbol or coin[:3]).upper(), (name or coin).upper(), GREY, BG_TOP)
+
 
 def zone_for(value):
     """Return (label, colour) for a fear/greed value 0-100."""